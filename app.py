@@ -1,113 +1,298 @@
+import queue
+import threading
 import tkinter as tk
 from tkinter import messagebox, simpledialog, ttk  # ttk for Treeview
-import json
-import os
-import psutil  # For retrieving network interfaces
-from wol import wake_up  # Import the wake_up function
+from interfaces import inventory  # Cached network interfaces (psutil)
+from routing import RoutingTable  # Finds the interface for a device IP address
+from status import StatusProber  # Probes the power state of the devices
+from discovery import read_neighbors, merge_into_store  # Scans the neighbor table for devices
+from wol import SocketPool  # Keeps the sockets open between wake actions
+from wake_worker import WakeWorker  # Sends on background threads
+from scheduler import WaveScheduler  # For waking all entries in paced waves
+from device_store import open_store  # Device repository (SQLite)
+from device_table import DeviceTable  # Incremental MAC table
+from groups import group_targets  # Send options of groups and tags
 
-# File to store MAC addresses
-DATA_FILE = "config/mac_addresses.json"
+# Keeps the sockets open between wake actions
+socket_pool = SocketPool()
+# Sends the packets so the GUI never waits for the network
+wake_worker = WakeWorker(socket_pool)
 
-# Load MAC addresses from file
-def load_data():
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, "r") as file:
-            return json.load(file)
-    return []
+# Pacing of "Wake All": packets per second, devices per wave and delay in seconds between waves
+WAKE_ALL_RATE = 200
+WAKE_ALL_WAVE_SIZE = 50
+WAKE_ALL_WAVE_DELAY = 2.0
+
+# Interval for polling the results of the worker
+POLL_INTERVAL_MS = 100
+# Interval for closing the sockets of the pool that were not used for its idle timeout
+IDLE_SOCKETS_INTERVAL_MS = 30000
+# Device ids of the rows waiting for a wake result, keyed by MAC address
+pending_rows = {}
 
-# Save MAC addresses to file
-def save_data(data):
-    with open(DATA_FILE, "w") as file:
-        json.dump(data, file, indent=4)
+# Interval for probing the power state of the devices, the prober caches the states for STATUS_TTL seconds
+STATUS_INTERVAL_MS = 15000
+STATUS_TTL = 30
+status_prober = StatusProber(ttl=STATUS_TTL)
+# (hosts, states) of the probe thread, (None, error) if probing failed
+power_results = queue.Queue()
+# Set while a probe thread runs, a refresh in the meantime is skipped
+probe_running = threading.Event()
+
+# Load the devices from the store, keyed by device id
+def load_data():
+    return {device["id"]: device for device in store.all()}
 
 # Add a new entry
 def add_entry():
     name = name_entry.get()
     mac = mac_entry.get()
+    group = group_entry.get() or None
     if not name or not mac:
         messagebox.showerror("Error", "Please enter both a name and a MAC address.")
         return
-    data.append({"name": name, "mac": mac})
-    save_data(data)
-    update_table()
+    try:
+        device_id = store.add(name, mac, group)
+    except ValueError as e:
+        messagebox.showerror("Error", str(e))
+        return
+    data[device_id] = store.get(device_id)
+    device_table.insert(data[device_id])
     name_entry.delete(0, tk.END)
     mac_entry.delete(0, tk.END)
+    group_entry.delete(0, tk.END)
 
 # Edit an entry
 def edit_entry():
-    selected_item = mac_table.selection()
-    if not selected_item:
+    selected_ids = device_table.selected_ids()
+    if not selected_ids:
         messagebox.showerror("Error", "Please select a row to edit.")
         return
-    index = int(mac_table.item(selected_item, "values")[0])
-    entry = data[index]
+    if len(selected_ids) > 1:
+        messagebox.showerror("Error", "Please select only one row to edit.")
+        return
+    entry = data[selected_ids[0]]
     new_name = simpledialog.askstring("Edit", "New Name:", initialvalue=entry["name"])
     new_mac = simpledialog.askstring("Edit", "New MAC Address:", initialvalue=entry["mac"])
+    new_group = simpledialog.askstring("Edit", "New Group (optional):", initialvalue=entry["group"] or "")
+    new_ip = simpledialog.askstring("Edit", "Last IP Address or Subnet, e.g. 192.168.1.0/24 (optional):",
+                                    initialvalue=entry["ip"] or "")
+    new_tags = simpledialog.askstring("Edit", "Tags, separated by commas (optional):",
+                                      initialvalue=", ".join(store.tags(entry["id"])))
     if new_name and new_mac:
-        data[index] = {"name": new_name, "mac": new_mac}
-        save_data(data)
-        update_table()
+        # A cancelled prompt (None) keeps the field, an empty answer clears it
+        changes = {"name": new_name, "mac": new_mac}
+        if new_group is not None:
+            changes["group"] = new_group or None
+        if new_ip is not None:
+            changes["ip"] = new_ip or None
+        try:
+            store.update(entry["id"], **changes)
+            if new_tags is not None:
+                store.set_tags(entry["id"], [tag.strip() for tag in new_tags.split(",") if tag.strip()])
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        data[entry["id"]] = store.get(entry["id"])
+        device_table.update(data[entry["id"]])
 
-# Delete an entry
+# Delete the selected entries, several only after confirmation
 def delete_entry():
-    selected_item = mac_table.selection()
-    if not selected_item:
+    selected_ids = device_table.selected_ids()
+    if not selected_ids:
         messagebox.showerror("Error", "Please select a row to delete.")
         return
-    index = int(mac_table.item(selected_item, "values")[0])
-    data.pop(index)
-    save_data(data)
-    update_table()
+    if len(selected_ids) > 1 and not messagebox.askyesno("Delete", f"Delete {len(selected_ids)} entries?"):
+        return
+    for device_id in selected_ids:
+        store.delete(device_id)
+        del data[device_id]
+        device_table.remove(device_id)
 
-# Wake an entry
-def wake_entry():
-    selected_mac = mac_table.selection()
-    if not selected_mac:
-        messagebox.showerror("Error", "Please select a row to wake.")
-        return    
-    mac = mac_table.item(selected_mac, "values")[2]
+# IP address of the interface selected in the interface table, or None
+def selected_interface_ip():
+    if interface_table.selection():
+        return interface_table.item(interface_table.selection())["values"][1]
+    return None
+
+# Read broadcast IP, port and interface IP from the input fields
+def get_send_options():
     broadcast_ip = broadcast_ip_entry.get()
     port = port_entry.get()
-    interface_ip = None
-
-    if interface_table.selection():
-        interface_ip = interface_table.item(interface_table.selection())["values"][1]  # IP of the selected interface
+    interface_ip = selected_interface_ip()
 
     if not broadcast_ip:
-        broadcast_ip = '255.255.255.255'
+        # Directed broadcast of the selected interface, 255.255.255.255 without interface
+        broadcast_ip = inventory.broadcast_for(interface_ip) if interface_ip else '255.255.255.255'
     if not port:
         port = 9
     else:
         port = int(port)
+    return broadcast_ip, port, interface_ip
+
+# Send a batch of devices on the worker, one socket per interface, the results are shown in the rows
+def wake_devices(devices):
+    broadcast_ip, port, interface_ip = get_send_options()
+    for device in devices:
+        pending_rows.setdefault(device["mac"], []).append(device["id"])
+        device_table.set_status(device["id"], "Sending...")
+    if interface_ip or broadcast_ip_entry.get():
+        targets = [device["mac"] for device in devices]
+    else:
+        # Nothing chosen by hand, route every device by its last IP address or subnet
+        targets = RoutingTable.from_inventory().targets(devices, broadcast_ip, port)
+    wake_worker.wake_many(targets, broadcast_ip, port, interface_ip)
+
+# Wake the selected entries
+def wake_entry():
+    selected_ids = device_table.selected_ids()
+    if not selected_ids:
+        messagebox.showerror("Error", "Please select one or more rows to wake.")
+        return
+    wake_devices([data[device_id] for device_id in selected_ids])
+
+# Wake all entries shown in the table (after filtering)
+def wake_visible():
+    visible_ids = device_table.visible_ids()
+    if not visible_ids:
+        messagebox.showerror("Error", "There are no entries to wake.")
+        return
+    wake_devices([data[device_id] for device_id in visible_ids])
+
+# Wake all entries of a group or tag with the send options of the group, options chosen by hand take precedence
+def wake_group():
+    group = simpledialog.askstring("Wake Group", "Group or tag:")
+    if not group:
+        return
+    devices = store.members(group)
+    if not devices:
+        messagebox.showerror("Error", f"There are no entries in group {group}.")
+        return
+    port = port_entry.get()
+    targets = group_targets(store, group, broadcast_ip_entry.get() or None, int(port) if port else None,
+                            selected_interface_ip())
+    for device in devices:
+        pending_rows.setdefault(device["mac"], []).append(device["id"])
+        device_table.set_status(device["id"], "Sending...")
+    status_label.config(text="")
+    wake_worker.wake_many(targets)
 
+# Set the preferred interface IP, broadcast IP and port of a group or tag
+def edit_group_options():
+    group = simpledialog.askstring("Group Options", "Group or tag:")
+    if not group:
+        return
+    options = store.group_options(group) or {}
+    interface_ip = simpledialog.askstring("Group Options", "Interface IP (optional):",
+                                          initialvalue=options.get("interface_ip") or "")
+    broadcast_ip = simpledialog.askstring("Group Options", "Broadcast IP (optional):",
+                                          initialvalue=options.get("broadcast_ip") or "")
+    port = simpledialog.askstring("Group Options", "Port (optional):", initialvalue=options.get("port") or "")
+    if interface_ip is None or broadcast_ip is None or port is None:
+        return  # Cancelled
     try:
-        wake_up(mac, broadcast_ip, port, interface_ip)  # Use the wake_up function
-        messagebox.showinfo("Success", f"Wake-on-LAN packet sent to: {mac} via {broadcast_ip}:{port} using interface {interface_ip}")
-    except Exception as e:
-        messagebox.showerror("Error", f"An error occurred: {e}")
-
-# Update the MAC table
-def update_table():
-    for row in mac_table.get_children():
-        mac_table.delete(row)
-    for i, entry in enumerate(data):
-        mac_table.insert("", "end", values=(i, entry["name"], entry["mac"]))
-
-# Retrieve network interfaces
-def get_network_interfaces():
-    interfaces = []
-    for interface, addrs in psutil.net_if_addrs().items():
-        for addr in addrs:
-            if addr.family == 2:  # psutil.AF_INET corresponds to the numeric value 2 (IPv4) because of changes in the new version of psutil
-                interfaces.append((interface, addr.address))
-    return interfaces
-
-# Update the interface table
-def update_interface_table():
+        port = int(port) if port else None
+    except ValueError:
+        messagebox.showerror("Error", f"Invalid port: {port}")
+        return
+    store.set_group_options(group, interface_ip or None, broadcast_ip or None, port)
+
+# Wake all entries in paced waves on the worker, every wave reports its results
+def wake_all():
+    if not data:
+        messagebox.showerror("Error", "There are no entries to wake.")
+        return
+    broadcast_ip, port, interface_ip = get_send_options()
+    devices = list(data.values())
+    for device in devices:
+        pending_rows.setdefault(device["mac"], []).append(device["id"])
+        device_table.set_status(device["id"], "Waiting...")
+
+    def job(report):
+        scheduler = WaveScheduler(WAKE_ALL_RATE, WAKE_ALL_WAVE_SIZE, WAKE_ALL_WAVE_DELAY, broadcast_ip, port,
+                                  interface_ip, progress=lambda done, total, wave_results: report(wave_results),
+                                  pool=socket_pool)
+        scheduler.run(devices)
+
+    wake_worker.submit(job, len(devices))
+
+# Show the results of the worker in the status area, runs every POLL_INTERVAL_MS on the Tk thread
+def poll_results():
+    for mac, error in wake_worker.results():
+        for device_id in pending_rows.pop(mac, []):
+            device_table.set_status(device_id, "Sent" if error is None else f"Error: {error}")
+        if error is not None:
+            status_label.config(text=f"Error for {mac}: {error}")
+    if wake_worker.expected:
+        progress_bar.config(maximum=wake_worker.expected, value=wake_worker.done)
+        status_text.set(f"Sent {wake_worker.done - wake_worker.failed}/{wake_worker.expected}, {wake_worker.failed} failed")
+    root.after(POLL_INTERVAL_MS, poll_results)
+
+# Close the idle sockets of the pool, runs every IDLE_SOCKETS_INTERVAL_MS on the Tk thread
+def close_idle_sockets():
+    socket_pool.close_idle()
+    root.after(IDLE_SOCKETS_INTERVAL_MS, close_idle_sockets)
+
+# Add the devices of the neighbor table to the store and reload the table
+def scan_network():
+    global data
+    try:
+        neighbors = read_neighbors()
+    except (OSError, ValueError) as e:
+        messagebox.showerror("Error", f"Could not read the neighbor table: {e}")
+        return
+    added, updated = merge_into_store(store, neighbors)
+    data = load_data()
+    update_table()
+    status_text.set(f"Scan: {added} devices added, {updated} devices updated")
+
+# Probe the power state of all devices with a known IP address on a background thread, one probe at a time
+def refresh_power_states():
+    hosts = {}
+    for device in data.values():
+        if device["ip"] and "/" not in device["ip"]:
+            hosts.setdefault(device["ip"], []).append(device["id"])
+    if hosts and not probe_running.is_set():
+        def probe():
+            try:
+                power_results.put((hosts, status_prober.probe_many_sync(hosts)))
+            except Exception as e:
+                power_results.put((None, e))
+            finally:
+                probe_running.clear()
+        probe_running.set()
+        threading.Thread(target=probe, daemon=True).start()
+    root.after(STATUS_INTERVAL_MS, refresh_power_states)
+
+# Show probed power states in the table, runs every POLL_INTERVAL_MS on the Tk thread
+def poll_power_states():
+    while not power_results.empty():
+        hosts, states = power_results.get_nowait()
+        if hosts is None:
+            status_text.set(f"Probing the power state failed: {states}")
+            continue
+        for host, device_ids in hosts.items():
+            for device_id in device_ids:
+                device_table.set_power(device_id, states[host])
+    root.after(POLL_INTERVAL_MS, poll_power_states)
+
+# Reload the MAC table with the entries matching the filter, the rows are inserted in chunks
+def update_table(event=None):
+    text = filter_entry.get().lower()
+    devices = [device for device in data.values()
+               if not text or text in device["name"].lower() or text in device["mac"].lower()
+               or text in (device["group"] or "").lower()]
+    device_table.load(devices)
+
+# Update the interface table, refresh=True reads the interfaces again instead of using the cache
+def update_interface_table(refresh=False):
     for row in interface_table.get_children():
         interface_table.delete(row)
-    for interface, ip in get_network_interfaces():
-        interface_table.insert("", "end", values=(interface, ip))
+    addresses = inventory.refresh() if refresh else inventory.addresses()
+    for address in addresses:
+        state = "up" if address.is_up else "down"
+        interface_table.insert("", "end", values=(address.name, address.address, address.netmask or "",
+                                                  address.broadcast or "", address.mtu or "", state))
 
 # Create the GUI
 root = tk.Tk()
@@ -122,39 +307,82 @@ tk.Label(root, text="MAC Address:").grid(row=0, column=2, padx=5, pady=5)
 mac_entry = tk.Entry(root, width=20)
 mac_entry.grid(row=0, column=3, padx=5, pady=5)
 
+tk.Label(root, text="Group:").grid(row=0, column=4, padx=5, pady=5)
+group_entry = tk.Entry(root, width=15)
+group_entry.grid(row=0, column=5, padx=5, pady=5)
+
 add_button = tk.Button(root, text="Add", command=add_entry)
-add_button.grid(row=0, column=4, padx=5, pady=5)
+add_button.grid(row=0, column=6, padx=5, pady=5)
 
-# Table for existing entries
-columns = ("Index", "Name", "MAC Address")
-mac_table = ttk.Treeview(root, columns=columns, show="headings")
-mac_table.heading("Index", text="Index")
+# Table for existing entries, several rows can be selected
+columns = ("ID", "Name", "MAC Address", "Group", "Status", "Power")
+mac_table = ttk.Treeview(root, columns=columns, show="headings", selectmode="extended")
+mac_table.heading("ID", text="ID")
 mac_table.heading("Name", text="Name")
 mac_table.heading("MAC Address", text="MAC Address")
-mac_table.column("Index", width=50)
+mac_table.heading("Group", text="Group")
+mac_table.heading("Status", text="Status")
+mac_table.heading("Power", text="Power")
+mac_table.column("ID", width=50)
 mac_table.column("Name", width=150)
 mac_table.column("MAC Address", width=150)
-mac_table.grid(row=1, column=0, columnspan=5, padx=5, pady=10)
+mac_table.column("Group", width=100)
+mac_table.column("Status", width=200)
+mac_table.column("Power", width=60)
+mac_table.grid(row=1, column=0, columnspan=7, padx=5, pady=10)
+device_table = DeviceTable(mac_table)
 
 # Buttons for actions
 button_frame = tk.Frame(root)
-button_frame.grid(row=2, column=0, columnspan=5, pady=10)
+button_frame.grid(row=2, column=0, columnspan=7, pady=10)
+
+tk.Label(button_frame, text="Filter:").pack(side=tk.LEFT)
+filter_entry = tk.Entry(button_frame, width=15)
+filter_entry.pack(side=tk.LEFT, padx=5)
+filter_entry.bind("<KeyRelease>", update_table)
 
 wake_button = tk.Button(button_frame, text="Wake", command=wake_entry)
 wake_button.pack(side=tk.LEFT, padx=10)
 
+wake_visible_button = tk.Button(button_frame, text="Wake Visible", command=wake_visible)
+wake_visible_button.pack(side=tk.LEFT, padx=10)
+
+wake_group_button = tk.Button(button_frame, text="Wake Group", command=wake_group)
+wake_group_button.pack(side=tk.LEFT, padx=10)
+
+group_options_button = tk.Button(button_frame, text="Group Options", command=edit_group_options)
+group_options_button.pack(side=tk.LEFT, padx=10)
+
 edit_button = tk.Button(button_frame, text="Edit", command=edit_entry)
 edit_button.pack(side=tk.LEFT, padx=10)
 
 delete_button = tk.Button(button_frame, text="Delete", command=delete_entry)
 delete_button.pack(side=tk.LEFT, padx=10)
 
+wake_all_button = tk.Button(button_frame, text="Wake All", command=wake_all)
+wake_all_button.pack(side=tk.LEFT, padx=10)
+
+scan_button = tk.Button(button_frame, text="Scan", command=scan_network)
+scan_button.pack(side=tk.LEFT, padx=10)
+
+# Status area for the results of the worker
+status_frame = tk.Frame(root)
+status_frame.grid(row=5, column=0, columnspan=7, padx=5, pady=5, sticky="we")
+status_text = tk.StringVar()
+progress_bar = ttk.Progressbar(status_frame, length=200, mode="determinate")
+progress_bar.pack(side=tk.LEFT, padx=5)
+tk.Label(status_frame, textvariable=status_text).pack(side=tk.LEFT, padx=5)
+status_label = tk.Label(status_frame, text="", fg="red")
+status_label.pack(side=tk.LEFT, padx=5)
+
 # Table for network interfaces
-interface_columns = ("Interface", "IP Address")
+interface_columns = ("Interface", "IP Address", "Netmask", "Broadcast", "MTU", "State")
 interface_table = ttk.Treeview(root, columns=interface_columns, show="headings")
-interface_table.heading("Interface", text="Interface")
-interface_table.heading("IP Address", text="IP Address")
-interface_table.grid(row=3, column=0, columnspan=5, padx=10, pady=10)
+for interface_column in interface_columns:
+    interface_table.heading(interface_column, text=interface_column)
+interface_table.column("MTU", width=60)
+interface_table.column("State", width=60)
+interface_table.grid(row=3, column=0, columnspan=7, padx=10, pady=10)
 
 # Input fields for broadcast IP and port
 tk.Label(root, text="Broadcast IP:").grid(row=4, column=0, padx=5, pady=5)
@@ -165,10 +393,21 @@ tk.Label(root, text="Port:").grid(row=4, column=2, padx=5, pady=5)
 port_entry = tk.Entry(root, width=20)
 port_entry.grid(row=4, column=3, padx=5, pady=5)
 
+refresh_interfaces_button = tk.Button(root, text="Refresh Interfaces", command=lambda: update_interface_table(refresh=True))
+refresh_interfaces_button.grid(row=4, column=4, columnspan=2, padx=5, pady=5)
+
 # Load data and update tables
+store = open_store()
 data = load_data()
 update_table()
 update_interface_table()
+poll_results()
+close_idle_sockets()
+refresh_power_states()
+poll_power_states()
 
 # Main loop of the GUI
-root.mainloop()
\ No newline at end of file
+root.mainloop()
+wake_worker.shutdown()
+socket_pool.close()
+store.close()
\ No newline at end of file
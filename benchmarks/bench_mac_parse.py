@@ -0,0 +1,58 @@
+"""
+Measures the MAC address parsing throughput of parse_macs against the former
+replace()/bytes.fromhex() chain, over a mix of all supported formats, e.g.:
+    python benchmarks/bench_mac_parse.py --count 300000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from mac_address import parse_macs  # noqa: E402
+
+
+def generate_mixed_macs(count):
+    """
+    Generates count MAC addresses cycling through all supported formats in upper and lower case.
+    """
+    macs = []
+    for i in range(count):
+        digits = f"{0x020000000000 + i:012x}"
+        digits = digits.upper() if i % 2 else digits
+        separator = ("", ":", "-", ".")[(i // 2) % 4]
+        macs.append(separator.join(digits[j:j + 2] for j in range(0, 12, 2)) if separator else digits)
+    return macs
+
+
+def parse_replace_chain(macs):
+    results = []
+    for mac in macs:
+        mac = mac.replace(":", "").replace("-", "").replace(".", "")
+        if len(mac) != 12:
+            raise ValueError("Invalid MAC address format")
+        results.append(bytes.fromhex(mac))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks MAC address parsing.")
+    parser.add_argument("--count", type=int, default=300000, help="Number of MAC addresses (default: 300000).")
+    args = parser.parse_args()
+
+    macs = generate_mixed_macs(args.count)
+    runs = (
+        ("replace chain (old)", parse_replace_chain),
+        ("parse_macs -> int", parse_macs),
+        ("parse_macs -> bytes", lambda texts: parse_macs(texts, as_bytes=True)),
+    )
+    for name, parse in runs:
+        start = time.perf_counter()
+        parse(macs)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<22} {args.count / elapsed:>12,.0f} MACs/sec ({elapsed:.3f} s)")
+
+
+if __name__ == "__main__":
+    main()
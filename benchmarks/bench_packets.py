@@ -0,0 +1,60 @@
+"""
+Compares building Magic Packets one by one with create_magic_packet against the
+preallocated batch builder create_magic_packets, e.g.:
+    python benchmarks/bench_packets.py --count 100000
+
+Reports the build time and the peak memory allocated while building (tracemalloc).
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from wol import create_magic_packet, create_magic_packets  # noqa: E402
+from bench_send import generate_macs  # noqa: E402
+
+
+def build_single(macs):
+    return [create_magic_packet(mac) for mac in macs]
+
+
+def build_batch(macs):
+    return create_magic_packets(macs)
+
+
+def measure(build, macs):
+    """
+    Returns (elapsed seconds, peak traced memory in bytes, packets) for one build.
+    """
+    start = time.perf_counter()
+    packets = build(macs)
+    elapsed = time.perf_counter() - start
+    del packets
+    tracemalloc.start()
+    packets = build(macs)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, packets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks Magic Packet creation.")
+    parser.add_argument("--count", type=int, default=100000, help="Number of packets per run (default: 100000).")
+    args = parser.parse_args()
+
+    macs = generate_macs(args.count)
+    results = [
+        ("create_magic_packet loop", *measure(build_single, macs)),
+        ("create_magic_packets", *measure(build_batch, macs)),
+    ]
+    if any(bytes(batch) != single for batch, single in zip(results[1][3], results[0][3])):
+        raise SystemExit("create_magic_packets and create_magic_packet differ")
+    for name, elapsed, peak, _ in results:
+        print(f"{name:<26} {args.count / elapsed:>12,.0f} packets/sec ({elapsed:.3f} s, peak {peak / 2**20:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Measures the packets/s the relay sustains on one core, on loopback aliases (all of 127.0.0.0/8 is local on Linux).
+
+handle: Relay.handle() called in-process, i.e. parsing, deduplication, rate limiting and sending to the outputs.
+end_to_end: a relay process (python wol.py relay serve) receiving Magic Packets on UDP from this process, e.g.:
+    python benchmarks/bench_relay.py --count 100000
+"""
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from relay import Relay, RelayOutput  # noqa: E402
+from wol import create_magic_packet  # noqa: E402
+from bench_send import generate_macs  # noqa: E402
+
+# Output interfaces of the relay, one socket each
+OUTPUT_IPS = ("127.0.0.2", "127.0.0.3")
+
+
+def generate_packets(count):
+    """
+    Generates count Magic Packets for distinct MAC addresses, so none of them is deduplicated.
+    """
+    return [create_magic_packet(mac) for mac in generate_macs(count)]
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def open_receivers():
+    """
+    Opens one receiver per output interface. Their buffers overflow, the kernel drops what is not read.
+    """
+    receivers = []
+    for ip in OUTPUT_IPS:
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver.bind((ip, 0))
+        receivers.append(receiver)
+    return receivers
+
+
+def bench_handle(packets):
+    receivers = open_receivers()
+    outputs = [RelayOutput(ip, *receiver.getsockname()) for ip, receiver in zip(OUTPUT_IPS, receivers)]
+    with Relay(outputs, listen_ports=()) as relay:
+        source = ("127.0.0.9", 40000)
+        start = time.perf_counter()
+        for packet in packets:
+            relay.handle(packet, source)
+        elapsed = time.perf_counter() - start
+    for receiver in receivers:
+        receiver.close()
+    return len(packets) / elapsed
+
+
+def bench_end_to_end(packets):
+    """
+    Returns (relayed packets/s while sending, fraction of the packets relayed).
+    """
+    receivers = open_receivers()
+    port = free_port()
+    command = [sys.executable, os.path.join(REPO_DIR, "wol.py"), "relay", "serve", "--listen", "127.0.0.1",
+               "--listen_ports", str(port), "--window", "60"]
+    for ip, receiver in zip(OUTPUT_IPS, receivers):
+        command += ["--target", "%s:%d@%s" % (*receiver.getsockname(), ip)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    try:
+        process.stdout.readline()  # "Relaying from ..." once it listens
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+            address = ("127.0.0.1", port)
+            start = time.perf_counter()
+            for packet in packets:
+                sender.sendto(packet, address)
+            elapsed = time.perf_counter() - start
+        time.sleep(0.5)  # Let the relay drain its receive buffer
+        process.send_signal(signal.SIGTERM)
+        stats = dict(item.rsplit(" ", 1) for item in process.stdout.readline().strip().split(", "))
+    finally:
+        process.wait(timeout=5)
+        for receiver in receivers:
+            receiver.close()
+    relayed = int(stats["relayed"])
+    return relayed / elapsed, relayed / len(packets)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the Wake-on-LAN relay.")
+    parser.add_argument("--count", type=int, default=100000, help="Number of Magic Packets (default: 100000).")
+    args = parser.parse_args()
+
+    packets = generate_packets(args.count)
+    print(f"handle:     {bench_handle(packets):>10.0f} packets/s to {len(OUTPUT_IPS)} outputs")
+    rate, fraction = bench_end_to_end(packets)
+    print(f"end_to_end: {rate:>10.0f} packets/s to {len(OUTPUT_IPS)} outputs, {fraction:.1%} relayed")
+
+
+if __name__ == "__main__":
+    main()
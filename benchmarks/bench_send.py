@@ -0,0 +1,53 @@
+"""
+Compares the packets/sec of send_magic_packets with a one-at-a-time send_magic_packet loop.
+
+The packets are sent to a UDP receiver on the loopback interface, e.g.:
+    python benchmarks/bench_send.py --count 5000
+"""
+import argparse
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from wol import send_magic_packet, send_magic_packets  # noqa: E402
+
+
+def generate_macs(count):
+    """
+    Generates count distinct MAC addresses.
+    """
+    return [":".join(f"{byte:02x}" for byte in (0x02, 0, *i.to_bytes(4, "big"))) for i in range(count)]
+
+
+def bench_single(macs, address):
+    start = time.perf_counter()
+    for mac in macs:
+        send_magic_packet(mac, address[0], address[1])
+    return time.perf_counter() - start
+
+
+def bench_batch(macs, address):
+    start = time.perf_counter()
+    send_magic_packets(macs, address[0], address[1])
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the Wake-on-LAN send path.")
+    parser.add_argument("--count", type=int, default=5000, help="Number of packets per run (default: 5000).")
+    args = parser.parse_args()
+
+    macs = generate_macs(args.count)
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as receiver:
+        receiver.bind(("127.0.0.1", 0))
+        address = receiver.getsockname()
+        for name, bench in (("send_magic_packet loop", bench_single), ("send_magic_packets", bench_batch)):
+            elapsed = bench(macs, address)
+            print(f"{name:<24} {args.count / elapsed:>12,.0f} packets/sec ({elapsed:.3f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Measures the startup time of the wol.py CLI: the wall time of `python wol.py --help` and of a single
+send to a loopback receiver, and the import time of the modules it loads (python -X importtime), e.g.:
+    python benchmarks/bench_startup.py --runs 20
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+WOL = os.path.join(REPO_DIR, "wol.py")
+
+
+def wall_time(arguments, runs):
+    """
+    Returns the seconds of the fastest of runs interpreter launches with these arguments.
+    """
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *arguments], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def import_times(arguments):
+    """
+    Runs python -X importtime and returns {module: cumulative microseconds} of the top-level imports.
+    """
+    output = subprocess.run([sys.executable, "-X", "importtime", *arguments], stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, text=True).stderr
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit() and not name.startswith("  "):  # Top-level imports only
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def bench_startup(runs):
+    """
+    Returns a list of result dicts in the format of suite.py.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as receiver:
+        receiver.bind(("127.0.0.1", 0))
+        ip, port = receiver.getsockname()
+        single_send = [WOL, "00:11:22:33:44:55", "--broadcast_ip", ip, "--port", str(port)]
+        results = [
+            {"name": "startup.python", "value": wall_time(["-c", "pass"], runs), "unit": "s"},
+            {"name": "startup.help", "value": wall_time([WOL, "--help"], runs), "unit": "s"},
+            {"name": "startup.single_send", "value": wall_time(single_send, runs), "unit": "s"},
+        ]
+        imports = import_times(single_send)
+    results.append({"name": "startup.imports", "value": sum(imports.values()) / 1e6, "unit": "s"})
+    return results, imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the startup time of the wol.py CLI.")
+    parser.add_argument("--runs", type=int, default=10, help="Interpreter launches per measurement (default: 10).")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest imports shown (default: 10).")
+    args = parser.parse_args()
+
+    results, imports = bench_startup(args.runs)
+    for result in results:
+        print(f"{result['name']:<22} {result['value'] * 1000:8.1f} ms")
+    print(f"Slowest top-level imports of a single send:")
+    for name, microseconds in sorted(imports.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {name:<20} {microseconds / 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
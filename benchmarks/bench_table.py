@@ -0,0 +1,87 @@
+"""
+Times MAC table refreshes in a hidden Tk root at 1k, 10k and 100k rows, e.g.:
+    python benchmarks/bench_table.py --sizes 1000 10000 100000
+
+Compares the former full rebuild (delete all rows, insert all rows) with the chunked
+DeviceTable.load and with single-row incremental changes. Needs a display (e.g. xvfb-run).
+"""
+import argparse
+import os
+import sys
+import time
+import tkinter as tk
+from tkinter import ttk
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from device_table import DeviceTable  # noqa: E402
+
+
+def generate_devices(count):
+    return [{"id": i + 1, "name": f"device{i}", "mac": f"02:00:{i >> 24 & 255:02x}:{i >> 16 & 255:02x}:{i >> 8 & 255:02x}:{i & 255:02x}"}
+            for i in range(count)]
+
+
+def full_rebuild(tree, devices):
+    """
+    The former update_table: deletes every row and inserts all rows again.
+    """
+    for row in tree.get_children():
+        tree.delete(row)
+    for i, entry in enumerate(devices):
+        tree.insert("", "end", values=(i, entry["name"], entry["mac"]))
+
+
+def chunked_load(root, table, devices):
+    """
+    Runs DeviceTable.load until the last chunk is inserted.
+    
+    :return: (total seconds, longest seconds the mainloop was blocked by one chunk)
+    """
+    done = []
+    longest_block = 0.0
+    start = time.perf_counter()
+    table.load(devices, on_done=lambda: done.append(True))
+    longest_block = time.perf_counter() - start  # The first chunk runs synchronously
+    while not done:
+        step = time.perf_counter()
+        root.update()
+        longest_block = max(longest_block, time.perf_counter() - step)
+    return time.perf_counter() - start, longest_block
+
+
+def incremental_changes(table, devices):
+    """
+    Adds, edits and deletes one row, as the GUI does for a single change.
+    """
+    device = {"id": len(devices) + 1, "name": "new", "mac": "02:ff:ff:ff:ff:ff"}
+    start = time.perf_counter()
+    table.insert(device)
+    table.update(dict(device, name="renamed"))
+    table.remove(device["id"])
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks MAC table refreshes.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Row counts (default: 1000 10000 100000).")
+    args = parser.parse_args()
+
+    root = tk.Tk()
+    root.withdraw()
+    tree = ttk.Treeview(root, columns=("ID", "Name", "MAC Address"), show="headings")
+    table = DeviceTable(tree)
+    for size in args.sizes:
+        devices = generate_devices(size)
+        start = time.perf_counter()
+        full_rebuild(tree, devices)
+        rebuild = time.perf_counter() - start
+        total, longest_block = chunked_load(root, table, devices)
+        incremental = incremental_changes(table, devices)
+        print(f"{size:>7} rows: full rebuild {rebuild:.3f} s | chunked load {total:.3f} s "
+              f"(longest block {longest_block * 1000:.1f} ms) | single change {incremental * 1000:.2f} ms")
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
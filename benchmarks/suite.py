@@ -0,0 +1,188 @@
+"""
+Benchmark suite for the hot paths, with machine-readable results to compare runs between versions, e.g.:
+    python benchmarks/suite.py --output results-new.json --compare results-old.json
+
+Measures:
+- create_magic_packet over a mix of all MAC address formats
+- UDP send throughput of send_magic_packet and send_magic_packets to a loopback receiver
+- device file I/O: the former JSON load/save against the SQLite device store, 1k to 100k devices
+- MAC table refresh in a hidden Tk root (skipped without a display)
+- startup time of the wol.py CLI
+- packets/s of the relay on loopback aliases
+"""
+import argparse
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from wol import create_magic_packet, send_magic_packet, send_magic_packets  # noqa: E402
+from device_store import DeviceStore  # noqa: E402
+from bench_mac_parse import generate_mixed_macs  # noqa: E402
+from bench_send import generate_macs  # noqa: E402
+from bench_startup import bench_startup  # noqa: E402
+from bench_relay import bench_handle, generate_packets  # noqa: E402
+
+
+def timed(function, *args):
+    """
+    Returns the seconds of the fastest of three runs of function(*args).
+    """
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_packet_build(results, count):
+    macs = generate_mixed_macs(count)
+    elapsed = timed(lambda: [create_magic_packet(mac) for mac in macs])
+    results.append({"name": "create_magic_packet.mixed_formats", "size": count, "value": count / elapsed, "unit": "packets/s"})
+
+
+def bench_udp_send(results, count):
+    macs = generate_macs(count)
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as receiver:
+        receiver.bind(("127.0.0.1", 0))
+        ip, port = receiver.getsockname()
+
+        def single():
+            for mac in macs:
+                send_magic_packet(mac, ip, port)
+
+        elapsed = timed(single)
+        results.append({"name": "send_magic_packet.loopback", "size": count, "value": count / elapsed, "unit": "packets/s"})
+        elapsed = timed(send_magic_packets, macs, ip, port)
+        results.append({"name": "send_magic_packets.loopback", "size": count, "value": count / elapsed, "unit": "packets/s"})
+
+
+def bench_config_io(results, sizes):
+    for size in sizes:
+        records = [{"name": f"device{i}", "mac": mac} for i, mac in enumerate(generate_mixed_macs(size))]
+        with tempfile.TemporaryDirectory() as directory:
+            json_path = os.path.join(directory, "mac_addresses.json")
+
+            def save_json():
+                with open(json_path, "w") as file:
+                    json.dump(records, file, indent=4)
+
+            def load_json():
+                with open(json_path, "r") as file:
+                    return json.load(file)
+
+            results.append({"name": "json.save_data", "size": size, "value": timed(save_json), "unit": "s"})
+            results.append({"name": "json.load_data", "size": size, "value": timed(load_json), "unit": "s"})
+
+            db_path = os.path.join(directory, "devices.db")
+            with DeviceStore(db_path) as store:
+                start = time.perf_counter()
+                store.import_json(json_path)
+                results.append({"name": "store.import_json", "size": size, "value": time.perf_counter() - start, "unit": "s"})
+                results.append({"name": "store.all", "size": size, "value": timed(store.all), "unit": "s"})
+
+                def single_row_changes():
+                    device_id = store.add("new", "02:ff:ff:ff:ff:ff")
+                    store.update(device_id, name="renamed")
+                    store.delete(device_id)
+
+                results.append({"name": "store.add_update_delete", "size": size, "value": timed(single_row_changes), "unit": "s"})
+                results.append({"name": "store.find_by_mac", "size": size, "value": timed(store.find_by_mac, records[-1]["mac"]), "unit": "s"})
+
+
+def bench_table(results, sizes):
+    try:
+        import tkinter as tk
+        from tkinter import ttk
+        root = tk.Tk()
+    except Exception as e:  # No tkinter or no display
+        results.append({"name": "table", "skipped": str(e)})
+        return
+    from device_table import DeviceTable
+    from bench_table import chunked_load, full_rebuild, generate_devices, incremental_changes
+    root.withdraw()
+    tree = ttk.Treeview(root, columns=("ID", "Name", "MAC Address", "Group", "Status", "Power"), show="headings")
+    table = DeviceTable(tree)
+    for size in sizes:
+        devices = generate_devices(size)
+        start = time.perf_counter()
+        full_rebuild(tree, devices)
+        results.append({"name": "table.full_rebuild", "size": size, "value": time.perf_counter() - start, "unit": "s"})
+        total, longest_block = chunked_load(root, table, devices)
+        results.append({"name": "table.chunked_load", "size": size, "value": total, "unit": "s"})
+        results.append({"name": "table.chunked_load.longest_block", "size": size, "value": longest_block, "unit": "s"})
+        results.append({"name": "table.single_change", "size": size, "value": incremental_changes(table, devices), "unit": "s"})
+    root.destroy()
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, previous_path):
+    """
+    Prints the ratio of every result to the same result of a previous run.
+    """
+    with open(previous_path, "r") as file:
+        previous = {(result["name"], result.get("size")): result for result in json.load(file)["results"]}
+    for result in results:
+        old = previous.get((result["name"], result.get("size")))
+        if old is None or "value" not in result or "value" not in old or not old["value"]:
+            continue
+        ratio = result["value"] / old["value"]
+        # Higher is better for rates, lower is better for durations
+        better = ratio > 1 if result["unit"].endswith("/s") else ratio < 1
+        print(f"{result['name']:<36} {result.get('size', ''):>7} {ratio:>6.2f}x {'better' if better else 'worse'}",
+              file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs the benchmark suite.")
+    parser.add_argument("--count", type=int, default=20000, help="Packets for the packet and send benchmarks (default: 20000).")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Device counts for config I/O and table (default: 1000 10000 100000).")
+    parser.add_argument("--runs", type=int, default=10, help="Interpreter launches for the startup benchmark (default: 10).")
+    parser.add_argument("--output", help="Write the results to this JSON file (default: stdout).")
+    parser.add_argument("--compare", help="A results file of a previous run to compare with.")
+    args = parser.parse_args()
+
+    results = []
+    bench_packet_build(results, args.count)
+    bench_udp_send(results, args.count)
+    bench_config_io(results, args.sizes)
+    bench_table(results, args.sizes)
+    results.extend(bench_startup(args.runs)[0])
+    results.append({"name": "relay.handle", "size": args.count, "value": bench_handle(generate_packets(args.count)), "unit": "packets/s"})
+
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=4)
+    else:
+        json.dump(report, sys.stdout, indent=4)
+        print()
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import stat
+
+from mac_address import format_mac, parse_mac
+from wol import send_magic_packets
+
+# Largest accepted request body or request line in bytes
+MAX_REQUEST_SIZE = 1024 * 1024
+
+_HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large"}
+
+class WakeDaemon:
+    """
+    Long-running Wake-on-LAN service. Loads the devices and the interface routing table once and sends
+    the Magic Packets of many clients in batches.
+
+    Requests for the same MAC address, broadcast IP, port and interface within window seconds are
+    coalesced into one send and share its result. New requests are collected for batch_delay seconds
+    and sent with one send_magic_packets call per interface.
+
+    :param devices: Device records to resolve device names and to route by IP address (optional).
+    :param routing: A RoutingTable to find the interface and broadcast address of a device (optional).
+    :param broadcast_ip: The default broadcast IP address (default: 255.255.255.255).
+    :param port: The default target port (default: 9).
+    :param window: The coalescing window in seconds (default: 1.0).
+    :param batch_delay: The seconds requests are collected before a batch is sent (default: 0.005).
+    """
+    def __init__(self, devices=(), routing=None, broadcast_ip='255.255.255.255', port=9, window=1.0, batch_delay=0.005):
+        self.routing = routing
+        self.broadcast_ip = broadcast_ip
+        self.port = port
+        self.window = window
+        self.batch_delay = batch_delay
+        self.stats = {"requests": 0, "coalesced": 0, "batches": 0, "sent": 0, "failed": 0}
+        self._by_name = {}
+        self._by_mac = {}
+        for device in devices:
+            if device.get("name"):
+                self._by_name.setdefault(device["name"], device)
+            try:
+                self._by_mac.setdefault(parse_mac(device["mac"]), device)
+            except ValueError:
+                continue
+        self._recent = {}  # (mac value, broadcast_ip, port, interface_ip) -> future of the send
+        self._batches = {}  # interface_ip -> [(key, future), ...]
+        self._tasks = set()
+
+    @classmethod
+    def from_store(cls, path=None, **kwargs):
+        """
+        Creates the daemon with the devices of the device store and the routing table of the local interfaces.
+        """
+        from device_store import DB_FILE, open_store
+        with open_store(path or DB_FILE) as store:
+            devices = store.all()
+        try:
+            from routing import RoutingTable
+            routing = RoutingTable.from_inventory()
+        except ImportError:
+            routing = None  # psutil is not installed, devices are sent with the defaults
+        return cls(devices, routing, **kwargs)
+
+    def _resolve(self, request):
+        """
+        Returns the coalescing key (mac value, broadcast_ip, port, interface_ip) of a request.
+
+        :raises ValueError: If the MAC address is invalid or the device name is unknown.
+        """
+        if isinstance(request, str):
+            request = {"mac": request}
+        name = request.get("name")
+        if name is not None:
+            device = self._by_name.get(name)
+            if device is None:
+                raise ValueError(f"Unknown device name: {name!r}")
+            value = parse_mac(device["mac"])
+        else:
+            value = parse_mac(request.get("mac") or "")
+            device = self._by_mac.get(value)
+        port = int(request.get("port") or self.port)
+        interface_ip = request.get("interface_ip")
+        broadcast_ip = request.get("broadcast_ip")
+        if self.routing is not None:
+            if interface_ip is None and broadcast_ip is None and device is not None:
+                interface_ip, broadcast_ip = self.routing.route(device.get("ip"), None, None)
+            elif interface_ip is not None and broadcast_ip is None:
+                address = self.routing.lookup(interface_ip)
+                broadcast_ip = address.broadcast if address is not None else None
+        return value, broadcast_ip or self.broadcast_ip, port, interface_ip
+
+    async def wake(self, request):
+        """
+        Wakes one device.
+
+        :param request: A MAC address, or a dict with "mac" or "name" and optional "broadcast_ip", "port"
+            and "interface_ip".
+        :return: A dict with the formatted "mac", "ok", "error" and whether the request was "coalesced".
+        """
+        self.stats["requests"] += 1
+        try:
+            key = self._resolve(request)
+        except (ValueError, TypeError, AttributeError) as e:
+            self.stats["failed"] += 1
+            return {"mac": None, "ok": False, "error": str(e), "coalesced": False}
+        future = self._recent.get(key)
+        coalesced = future is not None
+        if coalesced:
+            self.stats["coalesced"] += 1
+        else:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._recent[key] = future
+            loop.call_later(self.window, self._forget, key, future)
+            self._enqueue(key, future)
+        error = await asyncio.shield(future)
+        return {"mac": format_mac(key[0]), "ok": error is None, "error": error, "coalesced": coalesced}
+
+    async def wake_many(self, requests):
+        """
+        Wakes many devices. Returns the result dicts of wake() in request order.
+        """
+        return await asyncio.gather(*(self.wake(request) for request in requests))
+
+    def _forget(self, key, future):
+        if self._recent.get(key) is future:
+            del self._recent[key]
+
+    def _enqueue(self, key, future):
+        interface_ip = key[3]
+        batch = self._batches.get(interface_ip)
+        if batch is None:
+            batch = self._batches[interface_ip] = []
+            asyncio.get_running_loop().call_later(self.batch_delay, self._flush, interface_ip)
+        batch.append((key, future))
+
+    def _flush(self, interface_ip):
+        batch = self._batches.pop(interface_ip, None)
+        if batch:
+            task = asyncio.ensure_future(self._send_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send_batch(self, batch):
+        targets = [(format_mac(value), broadcast_ip, port, interface_ip)
+                   for (value, broadcast_ip, port, interface_ip), _ in batch]
+        self.stats["batches"] += 1
+        loop = asyncio.get_running_loop()
+        try:
+            # Sent in a worker thread so a full socket buffer does not stall the clients
+            results = await loop.run_in_executor(None, send_magic_packets, targets)
+        except Exception as e:
+            results = [(target[0], e) for target in targets]
+        for (_, future), (_, error) in zip(batch, results):
+            if error is None:
+                self.stats["sent"] += 1
+            else:
+                self.stats["failed"] += 1
+            if not future.done():
+                future.set_result(None if error is None else str(error))
+
+    async def handle(self, payload):
+        """
+        Handles a decoded request: one request for wake() or a list of them.
+        """
+        if isinstance(payload, list):
+            return await self.wake_many(payload)
+        return await self.wake(payload)
+
+    async def _handle_http(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, _, rest = request_line.decode("latin-1").strip().partition(" ")
+                path = rest.split(" ", 1)[0]
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_REQUEST_SIZE:
+                    await self._write_http(writer, 413, {"error": "Request too large"}, close=True)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                status, response = await self._route_http(method, path, body)
+                close = headers.get("connection", "").lower() == "close"
+                await self._write_http(writer, status, response, close)
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route_http(self, method, path, body):
+        if path == "/stats":
+            return 200, self.stats
+        if path != "/wake":
+            return 404, {"error": f"Unknown path: {path}"}
+        if method != "POST":
+            return 405, {"error": "Use POST"}
+        try:
+            payload = json.loads(body)
+        except ValueError as e:
+            return 400, {"error": f"Invalid JSON: {e}"}
+        return 200, await self.handle(payload)
+
+    @staticmethod
+    async def _write_http(writer, status, response, close=False):
+        body = json.dumps(response).encode()
+        head = (f"HTTP/1.1 {status} {_HTTP_REASONS[status]}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n")
+        writer.write(head.encode() + body)
+        await writer.drain()
+
+    async def _handle_lines(self, reader, writer):
+        """
+        Serves one JSON request per line. Requests of a connection are handled concurrently,
+        the responses are written one per line in request order.
+        """
+        pending = asyncio.Queue()
+
+        async def write_responses():
+            while True:
+                task = await pending.get()
+                if task is None:
+                    return
+                writer.write(json.dumps(await task).encode() + b"\n")
+                await writer.drain()
+
+        writer_task = asyncio.ensure_future(write_responses())
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    payload = json.loads(line)
+                except ValueError as e:
+                    response = asyncio.get_running_loop().create_future()
+                    response.set_result({"error": f"Invalid JSON: {e}"})
+                    pending.put_nowait(response)
+                    continue
+                pending.put_nowait(asyncio.ensure_future(self.handle(payload)))
+            pending.put_nowait(None)
+            await writer_task
+        except (ConnectionError, ValueError):
+            writer_task.cancel()
+        finally:
+            writer.close()
+
+    async def serve(self, http=None, unix_path=None):
+        """
+        Serves requests until cancelled.
+
+        :param http: (host, port) of the HTTP endpoint, POST /wake and GET /stats (optional).
+        :param unix_path: The path of the Unix socket with one JSON request per line (optional).
+        """
+        servers = []
+        if http is not None:
+            servers.append(await asyncio.start_server(self._handle_http, http[0], http[1], limit=MAX_REQUEST_SIZE))
+        if unix_path is not None:
+            if _is_socket(unix_path):
+                os.unlink(unix_path)  # Left over from a daemon that did not shut down
+            elif os.path.lexists(unix_path):
+                raise FileExistsError(f"{unix_path} exists and is not a socket")
+            # Created with the final permissions, owner and group only
+            umask = os.umask(0o117)
+            try:
+                servers.append(await asyncio.start_unix_server(self._handle_lines, unix_path, limit=MAX_REQUEST_SIZE))
+            finally:
+                os.umask(umask)
+        try:
+            await asyncio.gather(*(server.serve_forever() for server in servers))
+        finally:
+            for server in servers:
+                server.close()
+            if unix_path is not None and _is_socket(unix_path):
+                os.unlink(unix_path)
+
+def _is_socket(path):
+    try:
+        return stat.S_ISSOCK(os.lstat(path).st_mode)
+    except FileNotFoundError:
+        return False
+
+def _parse_address(text):
+    host, _, port = text.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+def daemon_main(argv=None):
+    """
+    Console command "daemon": serves wake requests over HTTP and a Unix socket.
+    """
+    parser = argparse.ArgumentParser(prog="wol.py daemon", description="Runs a Wake-on-LAN daemon that sends the Magic Packets of many clients.")
+    parser.add_argument("--http", default="127.0.0.1:8009", help="HOST:PORT of the HTTP endpoint (default: 127.0.0.1:8009), \"off\" to disable it.")
+    parser.add_argument("--unix", help="The path of the Unix socket (optional).")
+    parser.add_argument("--db", help="The device store database file (default: config/devices.db).")
+    parser.add_argument("--broadcast_ip", default="255.255.255.255", help="The default broadcast IP address (default: 255.255.255.255).")
+    parser.add_argument("--port", type=int, default=9, help="The default target port (default: 9).")
+    parser.add_argument("--window", type=float, default=1.0, help="The seconds duplicate requests are coalesced (default: 1.0).")
+    parser.add_argument("--batch_delay", type=float, default=0.005, help="The seconds requests are collected into a batch (default: 0.005).")
+    parser.add_argument("--metrics", type=int, metavar="PORT", help="Serve Prometheus metrics on this port (optional).")
+    args = parser.parse_args(argv)
+
+    http = None if args.http == "off" else _parse_address(args.http)
+    if args.unix and not hasattr(socket, "AF_UNIX"):
+        parser.error("Unix sockets are not supported on this system")
+    if args.unix and os.path.lexists(args.unix) and not _is_socket(args.unix):
+        parser.error(f"{args.unix} exists and is not a socket")
+    if http is None and not args.unix:
+        parser.error("Enable --http or --unix")
+    if args.metrics is not None:
+        import metrics
+        metrics.serve_prometheus(metrics.add_sink(metrics.PrometheusSink()), port=args.metrics)
+
+    daemon = WakeDaemon.from_store(args.db, broadcast_ip=args.broadcast_ip, port=args.port,
+                                   window=args.window, batch_delay=args.batch_delay)
+    endpoints = ([f"http://{http[0]}:{http[1]}"] if http else []) + ([args.unix] if args.unix else [])
+    print(f"Serving on {', '.join(endpoints)}", flush=True)
+    try:
+        asyncio.run(daemon.serve(http, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    daemon_main()
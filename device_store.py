@@ -0,0 +1,524 @@
+import argparse
+import json
+import os
+import sqlite3
+
+from mac_address import format_mac, parse_mac
+
+# Database file of the device store
+DB_FILE = "config/devices.db"
+# Former JSON device file, imported once into an empty store
+JSON_FILE = "config/mac_addresses.json"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS devices (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    mac TEXT NOT NULL,
+    mac_value INTEGER NOT NULL,
+    group_name TEXT,
+    priority INTEGER NOT NULL DEFAULT 0,
+    ip TEXT
+);
+CREATE INDEX IF NOT EXISTS devices_name ON devices (name);
+CREATE INDEX IF NOT EXISTS devices_mac_value ON devices (mac_value);
+CREATE INDEX IF NOT EXISTS devices_group_name ON devices (group_name);
+CREATE TABLE IF NOT EXISTS device_tags (
+    tag TEXT NOT NULL,
+    device_id INTEGER NOT NULL,
+    PRIMARY KEY (tag, device_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS device_tags_device_id ON device_tags (device_id);
+CREATE TABLE IF NOT EXISTS group_options (
+    name TEXT PRIMARY KEY,
+    interface_ip TEXT,
+    broadcast_ip TEXT,
+    port INTEGER
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Columns added after the first release, created on existing databases when opened
+_ADDED_COLUMNS = {
+    "ip": "ALTER TABLE devices ADD COLUMN ip TEXT",
+}
+
+_COLUMNS = "id, name, mac, group_name, priority, ip"
+
+# What to do when a device with the MAC address of a new device already exists
+ON_DUPLICATE = ("reject", "merge")
+
+class DuplicateMacError(ValueError):
+    """
+    Raised when a MAC address already belongs to another device.
+    
+    :param mac: The MAC address.
+    :param device: The device record with this MAC address, None for a duplicate within one import.
+    """
+    def __init__(self, mac, device=None):
+        self.device = device
+        owner = f"device {device['name']!r} (id {device['id']})" if device else "an earlier record"
+        super().__init__(f"MAC address {format_mac(parse_mac(mac))} already belongs to {owner}")
+
+def _check_on_duplicate(on_duplicate):
+    if on_duplicate not in ON_DUPLICATE:
+        raise ValueError(f"Unknown duplicate handling {on_duplicate!r}, expected one of {', '.join(ON_DUPLICATE)}")
+
+def _row_to_device(row):
+    """
+    Converts a database row into a device record dict.
+    """
+    device_id, name, mac, group_name, priority, ip = row
+    return {"id": device_id, "name": name, "mac": mac, "group": group_name, "priority": priority, "ip": ip}
+
+class DeviceStore:
+    """
+    Device repository backed by SQLite.
+    
+    Devices are stored as single rows with indexes on name, canonical MAC address and group,
+    so adding, editing or deleting a device only writes that row. Device records are dicts
+    with the keys id, name, mac, group, priority and ip (last known IP address or subnet in CIDR
+    notation, used to route the packets). Can be used as a context manager.
+    
+    Besides its one group a device can have any number of tags, stored in a table keyed by
+    (tag, device_id), so the members of a group or tag are found in O(number of members).
+    Groups and tags can carry preferred send options (interface IP, broadcast IP and port).
+    
+    A MAC address belongs to one device. The index on the canonical 48-bit MAC address is used
+    to reject or merge duplicates on add, edit and import, dedupe() merges the duplicates of
+    stores created before. The checks run in transactions that hold the write lock, so processes
+    sharing a store cannot add the same MAC address twice.
+    
+    :param path: The database file, ":memory:" for a temporary store (default: config/devices.db).
+    """
+    def __init__(self, path=DB_FILE):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        if path != ":memory:":
+            self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(_SCHEMA)
+        self._migrate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _migrate(self):
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(devices)")}
+        with self.connection:
+            for column, statement in _ADDED_COLUMNS.items():
+                if column not in columns:
+                    self.connection.execute(statement)
+
+    def close(self):
+        """
+        Closes the database connection.
+        """
+        self.connection.close()
+
+    def _write_transaction(self):
+        """
+        Begins a transaction that takes the write lock right away, so no other process can add a device
+        between a duplicate check and the write depending on it. Use as `with self._write_transaction():`.
+        """
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+
+    def add(self, name, mac, group=None, priority=0, ip=None, tags=(), on_duplicate="reject"):
+        """
+        Adds a device.
+        
+        :param name: The name of the device.
+        :param mac: The MAC address of the device, in one of the supported formats.
+        :param group: The group of the device (optional).
+        :param priority: The wake priority, higher wakes first (default: 0).
+        :param ip: The last known IP address or subnet of the device (optional).
+        :param tags: The tags of the device (optional).
+        :param on_duplicate: If a device with this MAC address exists, "reject" (default) raises
+            DuplicateMacError, "merge" merges group, priority, ip and tags into it (see dedupe).
+        :return: The id of the new device, or of the existing device it was merged into.
+        :raises MacAddressError: If the MAC address has an unsupported format.
+        :raises DuplicateMacError: If a device with this MAC address exists and on_duplicate is "reject".
+        """
+        _check_on_duplicate(on_duplicate)
+        mac_value = parse_mac(mac)
+        with self._write_transaction():
+            existing_id = self._id_by_mac_value(mac_value)
+            if existing_id is not None:
+                if on_duplicate == "reject":
+                    raise DuplicateMacError(mac, self.get(existing_id))
+                self._merge(existing_id, group, priority, ip, tags)
+                return existing_id
+            cursor = self.connection.execute(
+                "INSERT INTO devices (name, mac, mac_value, group_name, priority, ip) VALUES (?, ?, ?, ?, ?, ?)",
+                (name, mac, mac_value, group, priority, ip),
+            )
+            self._insert_tags(cursor.lastrowid, tags)
+        return cursor.lastrowid
+
+    def _id_by_mac_value(self, mac_value, exclude_id=None):
+        row = self.connection.execute(
+            "SELECT MIN(id) FROM devices WHERE mac_value = ? AND id IS NOT ?", (mac_value, exclude_id)
+        ).fetchone()
+        return row[0]
+
+    def _merge(self, device_id, group, priority, ip, tags):
+        """
+        Merges the fields of a duplicate into a device: group and ip only if the device has none,
+        the higher priority and all tags.
+        """
+        self.connection.execute(
+            "UPDATE devices SET group_name = COALESCE(group_name, ?), priority = MAX(priority, ?), "
+            "ip = COALESCE(ip, ?) WHERE id = ?", (group, priority or 0, ip, device_id)
+        )
+        self._insert_tags(device_id, tags)
+
+    def _insert_tags(self, device_id, tags):
+        self.connection.executemany("INSERT OR IGNORE INTO device_tags (tag, device_id) VALUES (?, ?)",
+                                    [(tag, device_id) for tag in tags])
+
+    def update(self, device_id, **changes):
+        """
+        Changes fields of a device.
+        
+        :param device_id: The id of the device.
+        :param changes: The new values for name, mac, group, priority and/or ip.
+        :raises KeyError: If there is no device with this id.
+        :raises MacAddressError: If the new MAC address has an unsupported format.
+        :raises DuplicateMacError: If the new MAC address belongs to another device.
+        """
+        columns = {"name": "name", "mac": "mac", "group": "group_name", "priority": "priority", "ip": "ip"}
+        unknown = set(changes) - set(columns)
+        if unknown:
+            raise TypeError(f"Unknown device fields: {', '.join(sorted(unknown))}")
+        assignments = [f"{columns[field]} = ?" for field in changes]
+        values = list(changes.values())
+        if "mac" in changes:
+            mac_value = parse_mac(changes["mac"])
+            assignments.append("mac_value = ?")
+            values.append(mac_value)
+        if not assignments:
+            return
+        with self._write_transaction():
+            if "mac" in changes:
+                existing_id = self._id_by_mac_value(mac_value, device_id)
+                if existing_id is not None:
+                    raise DuplicateMacError(changes["mac"], self.get(existing_id))
+            cursor = self.connection.execute(
+                f"UPDATE devices SET {', '.join(assignments)} WHERE id = ?", (*values, device_id)
+            )
+        if cursor.rowcount == 0:
+            raise KeyError(device_id)
+
+    def delete(self, device_id):
+        """
+        Deletes a device.
+        
+        :raises KeyError: If there is no device with this id.
+        """
+        with self.connection:
+            cursor = self.connection.execute("DELETE FROM devices WHERE id = ?", (device_id,))
+            self.connection.execute("DELETE FROM device_tags WHERE device_id = ?", (device_id,))
+        if cursor.rowcount == 0:
+            raise KeyError(device_id)
+
+    def tags(self, device_id):
+        """
+        Returns the sorted tags of a device.
+        """
+        rows = self.connection.execute("SELECT tag FROM device_tags WHERE device_id = ? ORDER BY tag", (device_id,))
+        return [tag for tag, in rows]
+
+    def set_tags(self, device_id, tags):
+        """
+        Replaces the tags of a device.
+        
+        :raises KeyError: If there is no device with this id.
+        """
+        if self.get(device_id) is None:
+            raise KeyError(device_id)
+        with self.connection:
+            self.connection.execute("DELETE FROM device_tags WHERE device_id = ?", (device_id,))
+            self._insert_tags(device_id, tags)
+
+    def get(self, device_id):
+        """
+        Returns the device with this id, or None.
+        """
+        row = self.connection.execute(f"SELECT {_COLUMNS} FROM devices WHERE id = ?", (device_id,)).fetchone()
+        return _row_to_device(row) if row else None
+
+    def all(self):
+        """
+        Returns all devices ordered by id.
+        """
+        return [_row_to_device(row) for row in self.connection.execute(f"SELECT {_COLUMNS} FROM devices ORDER BY id")]
+
+    def count(self):
+        """
+        Returns the number of devices.
+        """
+        return self.connection.execute("SELECT COUNT(*) FROM devices").fetchone()[0]
+
+    def find_by_name(self, name):
+        """
+        Returns all devices with exactly this name.
+        """
+        rows = self.connection.execute(f"SELECT {_COLUMNS} FROM devices WHERE name = ? ORDER BY id", (name,))
+        return [_row_to_device(row) for row in rows]
+
+    def find_by_name_pattern(self, pattern):
+        """
+        Returns all devices whose name matches a pattern.
+        
+        A pattern with glob characters (*, ?, [...]) is matched as a case-sensitive glob. Otherwise the devices
+        with exactly this name are returned, or the devices whose name starts with it if there are none.
+        The lookups use the name index, a glob scans only the index range of the characters before
+        its first wildcard (the whole index if it starts with a wildcard).
+        """
+        if not any(character in pattern for character in "*?["):
+            devices = self.find_by_name(pattern)
+            if devices:
+                return devices
+            pattern += "*"
+        # Sorted here, ORDER BY id would make SQLite sort in a temporary B-tree instead of using the range
+        rows = self.connection.execute(f"SELECT {_COLUMNS} FROM devices WHERE name GLOB ?", (pattern,)).fetchall()
+        rows.sort()
+        return [_row_to_device(row) for row in rows]
+
+    def find_by_mac(self, mac):
+        """
+        Returns all devices with this MAC address, in whatever format it was stored.
+        
+        :raises MacAddressError: If the MAC address has an unsupported format.
+        """
+        rows = self.connection.execute(
+            f"SELECT {_COLUMNS} FROM devices WHERE mac_value = ? ORDER BY id", (parse_mac(mac),)
+        )
+        return [_row_to_device(row) for row in rows]
+
+    def find_by_group(self, group):
+        """
+        Returns all devices of a group.
+        """
+        rows = self.connection.execute(f"SELECT {_COLUMNS} FROM devices WHERE group_name = ? ORDER BY id", (group,))
+        return [_row_to_device(row) for row in rows]
+
+    def find_by_tag(self, tag):
+        """
+        Returns all devices with a tag.
+        """
+        rows = self.connection.execute(
+            f"SELECT {_COLUMNS} FROM device_tags JOIN devices ON devices.id = device_tags.device_id "
+            "WHERE tag = ? ORDER BY devices.id", (tag,)
+        )
+        return [_row_to_device(row) for row in rows]
+
+    def members(self, name):
+        """
+        Returns the devices of the group or with the tag of this name, each device once, ordered by id.
+        """
+        devices = {device["id"]: device for device in self.find_by_group(name)}
+        for device in self.find_by_tag(name):
+            devices.setdefault(device["id"], device)
+        return [devices[device_id] for device_id in sorted(devices)]
+
+    def groups(self):
+        """
+        Returns the sorted names of all groups and tags.
+        """
+        rows = self.connection.execute(
+            "SELECT group_name FROM devices WHERE group_name IS NOT NULL UNION SELECT tag FROM device_tags ORDER BY 1"
+        )
+        return [name for name, in rows]
+
+    def group_options(self, name):
+        """
+        Returns the preferred send options of a group or tag as dict with the keys interface_ip,
+        broadcast_ip and port (None if not set), or None if the group has no options.
+        """
+        row = self.connection.execute(
+            "SELECT interface_ip, broadcast_ip, port FROM group_options WHERE name = ?", (name,)
+        ).fetchone()
+        return dict(zip(("interface_ip", "broadcast_ip", "port"), row)) if row else None
+
+    def set_group_options(self, name, interface_ip=None, broadcast_ip=None, port=None):
+        """
+        Sets the preferred send options of a group or tag. Without options they are removed.
+        """
+        with self.connection:
+            if interface_ip is None and broadcast_ip is None and port is None:
+                self.connection.execute("DELETE FROM group_options WHERE name = ?", (name,))
+            else:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO group_options (name, interface_ip, broadcast_ip, port) VALUES (?, ?, ?, ?)",
+                    (name, interface_ip, broadcast_ip, port),
+                )
+
+    def import_json(self, path=JSON_FILE, on_duplicate="merge"):
+        """
+        Imports the devices of a JSON device file (a list of {"name", "mac"} dicts, optionally with
+        "group", "priority", "ip" and a "tags" list) in one transaction.
+        
+        :param on_duplicate: For records with the MAC address of a stored device or of an earlier record,
+            "merge" (default) merges them into that device (see dedupe), "reject" skips them with a DuplicateMacError.
+        :return: A list of (record, error) tuples for the records that could not be imported.
+        """
+        _check_on_duplicate(on_duplicate)
+        with open(path, "r") as file:
+            records = json.load(file)
+        with self._write_transaction():
+            known = dict(self.connection.execute("SELECT mac_value, MIN(id) FROM devices GROUP BY mac_value"))
+            new = {}  # mac_value -> index of the row
+            rows = []
+            tagged = []
+            merges = []
+            errors = []
+            for record in records:
+                try:
+                    row = [record["name"], record["mac"], parse_mac(record["mac"]),
+                           record.get("group"), record.get("priority") or 0, record.get("ip")]
+                    tags = list(record.get("tags") or ())
+                except (KeyError, TypeError, ValueError) as e:
+                    errors.append((record, e))
+                    continue
+                mac_value = row[2]
+                if mac_value in known or mac_value in new:
+                    if on_duplicate == "reject":
+                        device = self.get(known[mac_value]) if mac_value in known else None
+                        errors.append((record, DuplicateMacError(record["mac"], device)))
+                    elif mac_value in known:
+                        merges.append((known[mac_value], row[3], row[4], row[5], tags))
+                    else:
+                        index = new[mac_value]
+                        first = rows[index]
+                        first[3] = first[3] if first[3] is not None else row[3]
+                        first[4] = max(first[4], row[4])
+                        first[5] = first[5] if first[5] is not None else row[5]
+                        tagged[index].extend(tags)
+                    continue
+                new[mac_value] = len(rows)
+                rows.append(row)
+                tagged.append(tags)
+            insert = "INSERT INTO devices (name, mac, mac_value, group_name, priority, ip) VALUES (?, ?, ?, ?, ?, ?)"
+            if not any(tagged):
+                self.connection.executemany(insert, rows)
+            else:
+                # The tags need the ids of the new rows
+                for row, tags in zip(rows, tagged):
+                    self._insert_tags(self.connection.execute(insert, row).lastrowid, tags)
+            for merge in merges:
+                self._merge(*merge)
+        return errors
+
+    def dedupe(self, dry_run=False):
+        """
+        Merges the devices with the same canonical MAC address into the one with the lowest id.
+        
+        The kept device gets the group and ip of a duplicate if it has none, the highest priority and
+        the tags of all duplicates. The duplicates are deleted.
+        
+        :param dry_run: Only return what would be merged.
+        :return: A list of (kept device, [duplicate devices]) tuples.
+        """
+        merged = []
+        with self._write_transaction():
+            values = [value for value, in self.connection.execute(
+                "SELECT mac_value FROM devices GROUP BY mac_value HAVING COUNT(*) > 1"
+            )]
+            for value in values:
+                rows = self.connection.execute(f"SELECT {_COLUMNS} FROM devices WHERE mac_value = ? ORDER BY id", (value,))
+                kept, *duplicates = [_row_to_device(row) for row in rows]
+                merged.append((kept, duplicates))
+                if dry_run:
+                    continue
+                for device in duplicates:
+                    self._merge(kept["id"], device["group"], device["priority"], device["ip"], self.tags(device["id"]))
+                    self.connection.execute("DELETE FROM devices WHERE id = ?", (device["id"],))
+                    self.connection.execute("DELETE FROM device_tags WHERE device_id = ?", (device["id"],))
+        return merged
+
+    def import_json_once(self, path=JSON_FILE):
+        """
+        Imports the JSON device file if it exists and was not imported into this store before.
+        
+        :return: The import errors (see import_json), or an empty list if nothing was imported.
+        """
+        if not os.path.exists(path):
+            return []
+        key = f"imported:{os.path.abspath(path)}"
+        if self.connection.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+            return []
+        errors = self.import_json(path)
+        with self.connection:
+            self.connection.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (key, "1"))
+        return errors
+
+def open_store(path=DB_FILE, json_path=JSON_FILE):
+    """
+    Opens the device store and imports the former JSON device file on first use.
+    """
+    store = DeviceStore(path)
+    for record, error in store.import_json_once(json_path):
+        print(f"Skipped device {record!r}: {error}")
+    return store
+
+def main():
+    """
+    Manages the device store via the console.
+    """
+    parser = argparse.ArgumentParser(description="Manages the Wake-on-LAN device store.")
+    parser.add_argument("--db", default=DB_FILE, help=f"The database file (default: {DB_FILE}).")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    import_parser = subparsers.add_parser("import", help="Imports a JSON device file.")
+    import_parser.add_argument("json_file", help="The JSON device file.")
+    import_parser.add_argument("--on_duplicate", choices=ON_DUPLICATE, default="merge", help="Merge records with a known MAC address into that device (default) or skip them.")
+    subparsers.add_parser("list", help="Lists all devices.")
+    tag_parser = subparsers.add_parser("tag", help="Sets the tags of a device.")
+    tag_parser.add_argument("device_id", type=int, help="The id of the device.")
+    tag_parser.add_argument("tags", nargs="*", help="The new tags (none to remove all tags).")
+    dedupe_parser = subparsers.add_parser("dedupe", help="Merges devices with the same MAC address.")
+    dedupe_parser.add_argument("--dry_run", action="store_true", help="Only show the duplicates.")
+    subparsers.add_parser("groups", help="Lists all groups and tags with their members and send options.")
+    options_parser = subparsers.add_parser("group-options", help="Sets the preferred send options of a group or tag.")
+    options_parser.add_argument("name", help="The group or tag.")
+    options_parser.add_argument("--interface_ip", help="The IP address of the network interface.")
+    options_parser.add_argument("--broadcast_ip", help="The broadcast IP address.")
+    options_parser.add_argument("--port", type=int, help="The target port.")
+
+    args = parser.parse_args()
+
+    with DeviceStore(args.db) as store:
+        if args.command == "import":
+            errors = store.import_json(args.json_file, args.on_duplicate)
+            for record, error in errors:
+                print(f"Skipped device {record!r}: {error}")
+        elif args.command == "list":
+            for device in store.all():
+                print(f"{device['id']:>6}  {format_mac(parse_mac(device['mac']))}  {device['name']}  {device['group'] or ''}")
+        elif args.command == "tag":
+            store.set_tags(args.device_id, args.tags)
+        elif args.command == "dedupe":
+            merged = store.dedupe(args.dry_run)
+            for kept, duplicates in merged:
+                ids = ", ".join(str(device["id"]) for device in duplicates)
+                print(f"{format_mac(parse_mac(kept['mac']))}: kept {kept['id']} ({kept['name']}), "
+                      f"{'duplicates' if args.dry_run else 'merged'} {ids}")
+            print(f"{sum(len(duplicates) for _, duplicates in merged)} duplicates"
+                  f"{' found' if args.dry_run else ' merged'}")
+        elif args.command == "groups":
+            for name in store.groups():
+                options = store.group_options(name) or {}
+                options = ", ".join(f"{key}={value}" for key, value in options.items() if value is not None)
+                print(f"{name}  {len(store.members(name))} devices  {options}".rstrip())
+        elif args.command == "group-options":
+            store.set_group_options(args.name, args.interface_ip, args.broadcast_ip, args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# Number of rows inserted per chunk when loading, between two chunks the Tk mainloop handles events
+LOAD_CHUNK_SIZE = 500
+
+class DeviceTable:
+    """
+    Keeps a ttk.Treeview of devices in sync with incremental changes.
+    
+    Every row uses the device id as its Treeview item id, so adding, editing or deleting a device
+    touches only that row. load() inserts the rows in chunks scheduled with after(), so loading
+    a large inventory never blocks the Tk mainloop.
+    
+    The Status column shows the result of the last wake action inline, the Power column the last
+    probed power state. Both survive edits and reloads.
+    
+    :param tree: The ttk.Treeview with the columns (ID, Name, MAC Address, Group, Status, Power).
+    :param chunk_size: The number of rows inserted per chunk (default: 500).
+    """
+    def __init__(self, tree, chunk_size=LOAD_CHUNK_SIZE):
+        self.tree = tree
+        self.chunk_size = chunk_size
+        self._load_job = None
+        self._statuses = {}  # device id -> status text
+        self._power = {}  # device id -> power state text
+
+    def _values(self, device):
+        return (device["id"], device["name"], device["mac"], device.get("group") or "",
+                self._statuses.get(device["id"], ""), self._power.get(device["id"], ""))
+
+    def load(self, devices, on_done=None):
+        """
+        Replaces all rows with the devices, inserting them chunk by chunk.
+        
+        :param devices: A list of device records.
+        :param on_done: Callback called after the last chunk (optional).
+        """
+        self.cancel_load()
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+
+        def insert_chunk(start):
+            for device in devices[start:start + self.chunk_size]:
+                self.tree.insert("", "end", iid=str(device["id"]), values=self._values(device))
+            if start + self.chunk_size < len(devices):
+                self._load_job = self.tree.after(1, insert_chunk, start + self.chunk_size)
+            else:
+                self._load_job = None
+                if on_done is not None:
+                    on_done()
+
+        insert_chunk(0)
+
+    def cancel_load(self):
+        """
+        Stops a chunked load that is still running.
+        """
+        if self._load_job is not None:
+            self.tree.after_cancel(self._load_job)
+            self._load_job = None
+
+    def insert(self, device):
+        """
+        Appends the row of a new device.
+        """
+        self.tree.insert("", "end", iid=str(device["id"]), values=self._values(device))
+
+    def update(self, device):
+        """
+        Updates the row of a changed device in place.
+        """
+        self.tree.item(str(device["id"]), values=self._values(device))
+
+    def remove(self, device_id):
+        """
+        Removes the row of a deleted device.
+        """
+        self._statuses.pop(device_id, None)
+        self._power.pop(device_id, None)
+        if self.tree.exists(str(device_id)):
+            self.tree.delete(str(device_id))
+
+    def set_status(self, device_id, status):
+        """
+        Shows the status of a device (e.g. the result of a wake action) in its row.
+        """
+        self._statuses[device_id] = status
+        if self.tree.exists(str(device_id)):
+            self.tree.set(str(device_id), "Status", status)
+
+    def set_power(self, device_id, powered_on):
+        """
+        Shows the probed power state of a device in its row.
+        """
+        self._power[device_id] = "on" if powered_on else "off"
+        if self.tree.exists(str(device_id)):
+            self.tree.set(str(device_id), "Power", self._power[device_id])
+
+    def visible_ids(self):
+        """
+        Returns the device ids of all rows currently shown.
+        """
+        return [int(item) for item in self.tree.get_children()]
+
+    def selected_ids(self):
+        """
+        Returns the device ids of the selected rows.
+        """
+        return [int(item) for item in self.tree.selection()]
@@ -0,0 +1,148 @@
+import argparse
+import asyncio
+import ipaddress
+import os
+import socket
+import subprocess
+from collections import namedtuple
+
+from mac_address import format_mac, parse_mac
+
+# Kernel neighbor table on Linux
+PROC_NET_ARP = "/proc/net/arp"
+
+# One entry of a neighbor table. mac_value is the canonical 48-bit MAC address.
+Neighbor = namedtuple("Neighbor", ["ip", "mac", "mac_value", "interface", "state"])
+
+def _parse_proc_arp_line(fields):
+    # IP address, HW type, Flags, HW address, Mask, Device
+    if len(fields) < 6 or fields[2] == "0x0":  # Flags 0x0: incomplete entry
+        return None
+    return fields[0], fields[3], fields[5], "REACHABLE"
+
+def _parse_ip_neigh_line(fields):
+    # 192.168.1.1 dev eth0 lladdr aa:bb:cc:dd:ee:ff [router] STALE
+    if "lladdr" not in fields:
+        return None
+    interface = fields[fields.index("dev") + 1] if "dev" in fields else None
+    return fields[0], fields[fields.index("lladdr") + 1], interface, fields[-1]
+
+def parse_neighbors(lines):
+    """
+    Parses a neighbor table line by line, as a generator.
+    
+    Accepts the format of /proc/net/arp and the output of "ip neigh" (also saved to a file).
+    Incomplete and failed entries, IPv6 neighbors and invalid MAC addresses are skipped.
+    
+    :param lines: An iterable of text lines, e.g. an open file.
+    :return: A generator of Neighbor tuples.
+    """
+    for line in lines:
+        fields = line.split()
+        if not fields or fields[0] == "IP":  # Empty line or /proc/net/arp header
+            continue
+        parse = _parse_ip_neigh_line if "dev" in fields or "lladdr" in fields else _parse_proc_arp_line
+        entry = parse(fields)
+        if entry is None:
+            continue
+        ip, mac, interface, state = entry
+        try:
+            if ipaddress.ip_address(ip).version != 4:
+                continue
+            mac_value = parse_mac(mac)
+        except ValueError:  # Also MacAddressError
+            continue
+        if mac_value == 0:
+            continue
+        yield Neighbor(ip, mac, mac_value, interface, state)
+
+def read_neighbors(path=None):
+    """
+    Reads the neighbor table of this system, or a saved neighbor table file.
+    
+    :param path: A saved /proc/net/arp or "ip neigh" file (default: the live table of this system).
+    :return: A list of Neighbor tuples.
+    """
+    if path is not None:
+        with open(path, "r") as file:
+            return list(parse_neighbors(file))
+    if os.path.exists(PROC_NET_ARP):
+        with open(PROC_NET_ARP, "r") as file:
+            return list(parse_neighbors(file))
+    output = subprocess.run(["ip", "neigh"], capture_output=True, text=True, check=True).stdout
+    return list(parse_neighbors(output.splitlines()))
+
+async def sweep(network, port=9, concurrency=1024, settle_time=1.0):
+    """
+    Sends one empty UDP datagram to every host of a subnet, so the kernel resolves their MAC addresses.
+    
+    The datagrams themselves need no answer, the ARP requests before them fill the neighbor table.
+    A /22 takes about settle_time seconds.
+    
+    :param network: The subnet, e.g. "192.168.0.0/22".
+    :param port: The UDP port of the datagrams (default: 9, discard).
+    :param concurrency: The maximum number of datagrams sent before yielding to the event loop (default: 1024).
+    :param settle_time: Seconds to wait for the ARP replies after the last datagram (default: 1.0).
+    """
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, family=socket.AF_INET)
+    try:
+        for number, host in enumerate(ipaddress.IPv4Network(network, strict=False).hosts()):
+            transport.sendto(b"", (str(host), port))
+            if number % concurrency == concurrency - 1:
+                await asyncio.sleep(0)
+        await asyncio.sleep(settle_time)
+    finally:
+        transport.close()
+
+def merge_into_store(store, neighbors):
+    """
+    Merges neighbors into the device store, deduplicated by canonical MAC address.
+    
+    A known MAC address gets its IP address updated if it changed, a new one is added with
+    its IP address as name.
+    
+    :param store: The DeviceStore.
+    :param neighbors: An iterable of Neighbor tuples.
+    :return: A tuple (added, updated).
+    """
+    added = updated = 0
+    seen = set()
+    for neighbor in neighbors:
+        if neighbor.mac_value in seen:
+            continue
+        seen.add(neighbor.mac_value)
+        devices = store.find_by_mac(neighbor.mac)
+        if not devices:
+            store.add(neighbor.ip, format_mac(neighbor.mac_value), ip=neighbor.ip)
+            added += 1
+            continue
+        for device in devices:
+            if device["ip"] != neighbor.ip:
+                store.update(device["id"], ip=neighbor.ip)
+                updated += 1
+    return added, updated
+
+def main():
+    """
+    Scans for network devices via the console.
+    """
+    parser = argparse.ArgumentParser(description="Scans the neighbor table for network devices.")
+    parser.add_argument("--file", help="A saved /proc/net/arp or \"ip neigh\" file instead of the live neighbor table.")
+    parser.add_argument("--sweep", metavar="SUBNET", help="Probe every host of the subnet first (e.g. 192.168.0.0/22).")
+    parser.add_argument("--merge", action="store_true", help="Add new devices to the device store and update known ones.")
+    args = parser.parse_args()
+
+    if args.sweep:
+        asyncio.run(sweep(args.sweep))
+    neighbors = read_neighbors(args.file)
+    for neighbor in neighbors:
+        print(f"{neighbor.ip:<16} {format_mac(neighbor.mac_value)}  {neighbor.interface or ''}  {neighbor.state}")
+    if args.merge:
+        from device_store import open_store
+        with open_store() as store:
+            added, updated = merge_into_store(store, neighbors)
+        print(f"{added} devices added, {updated} devices updated")
+
+if __name__ == "__main__":
+    main()
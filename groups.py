@@ -0,0 +1,46 @@
+from collections import namedtuple
+
+from wol import default_broadcast_ip, send_magic_packets
+
+# Aggregated result of waking a group: errors is a list of (mac_address, error) tuples of the failed devices
+GroupResult = namedtuple("GroupResult", "name total sent failed errors")
+
+def group_targets(store, name, broadcast_ip=None, port=None, interface_ip=None):
+    """
+    Returns the target tuples (mac_address, broadcast_ip, port, interface_ip) of the members of a group or tag.
+
+    Options given here override the preferred send options of the group, which override the defaults
+    (the broadcast address of the interface, port 9).
+
+    :param store: The DeviceStore.
+    :param name: The group or tag.
+    """
+    options = store.group_options(name) or {}
+    interface_ip = interface_ip or options.get("interface_ip")
+    broadcast_ip = broadcast_ip or options.get("broadcast_ip") or default_broadcast_ip(interface_ip)
+    port = port or options.get("port") or 9
+    return [(device["mac"], broadcast_ip, port, interface_ip) for device in store.members(name)]
+
+def wake_groups(store, names, broadcast_ip=None, port=None, interface_ip=None):
+    """
+    Wakes the members of groups or tags in one batch and aggregates the results per group.
+
+    :param store: The DeviceStore.
+    :param names: The groups or tags.
+    :param broadcast_ip: The broadcast IP address for all groups (default: the one of each group).
+    :param port: The target port for all groups (default: the one of each group).
+    :param interface_ip: The IP address of the network interface for all groups (default: the one of each group).
+    :return: A list of GroupResult in the order of names.
+    """
+    spans = []
+    targets = []
+    for name in names:
+        group = group_targets(store, name, broadcast_ip, port, interface_ip)
+        spans.append((name, len(targets), len(targets) + len(group)))
+        targets.extend(group)
+    results = send_magic_packets(targets)
+    group_results = []
+    for name, start, end in spans:
+        errors = [(mac_address, error) for mac_address, error in results[start:end] if error is not None]
+        group_results.append(GroupResult(name, end - start, end - start - len(errors), len(errors), errors))
+    return group_results
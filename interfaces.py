@@ -0,0 +1,100 @@
+import ipaddress
+import socket
+import threading
+import time
+from collections import namedtuple
+
+# One IPv4 address of a network interface
+InterfaceAddress = namedtuple("InterfaceAddress", ["name", "address", "netmask", "broadcast", "mtu", "is_up"])
+
+def directed_broadcast(address, netmask):
+    """
+    Computes the directed broadcast address of a subnet, e.g. 192.168.1.255 for 192.168.1.10/255.255.255.0.
+    
+    :param address: The IPv4 address of the interface.
+    :param netmask: The netmask of the interface.
+    :return: The broadcast address as string, or None for /31 and /32 networks that have none.
+    """
+    network = ipaddress.IPv4Network(f"{address}/{netmask}", strict=False)
+    if network.prefixlen >= 31:
+        return None
+    return str(network.broadcast_address)
+
+def _read_interfaces():
+    """
+    Reads the IPv4 addresses of all network interfaces with psutil.
+    """
+    import psutil  # Imported here so wol.py can be used without psutil
+    stats = psutil.net_if_stats()
+    addresses = []
+    for name, addrs in psutil.net_if_addrs().items():
+        stat = stats.get(name)
+        for addr in addrs:
+            if addr.family != socket.AF_INET:
+                continue
+            broadcast = addr.broadcast
+            if addr.netmask:
+                broadcast = directed_broadcast(addr.address, addr.netmask) or broadcast
+            addresses.append(InterfaceAddress(
+                name, addr.address, addr.netmask, broadcast,
+                stat.mtu if stat else None, stat.isup if stat else None,
+            ))
+    return addresses
+
+class InterfaceInventory:
+    """
+    Cached inventory of the IPv4 addresses of the local network interfaces.
+    
+    The interfaces are read at most once per ttl seconds, refresh() reads them again immediately.
+    Every address carries netmask, directed broadcast address, MTU and up/down state. Thread-safe.
+    
+    :param ttl: Seconds the inventory is cached (default: 30).
+    """
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        self._addresses = None
+        self._read_at = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """
+        Reads the interfaces again and returns the addresses.
+        """
+        addresses = _read_interfaces()
+        with self._lock:
+            self._addresses = addresses
+            self._read_at = time.monotonic()
+        return addresses
+
+    def addresses(self):
+        """
+        Returns a list of InterfaceAddress tuples, read again if the cache expired.
+        """
+        with self._lock:
+            if self._addresses is not None and time.monotonic() - self._read_at < self.ttl:
+                return self._addresses
+        return self.refresh()
+
+    def find(self, interface_ip):
+        """
+        Returns the InterfaceAddress with this IP address, or None.
+        """
+        for address in self.addresses():
+            if address.address == interface_ip:
+                return address
+        return None
+
+    def broadcast_for(self, interface_ip, default='255.255.255.255'):
+        """
+        Returns the directed broadcast address of the interface with this IP address.
+        
+        :param interface_ip: The IP address of the network interface.
+        :param default: Returned if the interface is unknown or has no broadcast address.
+        """
+        address = self.find(interface_ip)
+        if address is None or address.broadcast is None:
+            return default
+        return address.broadcast
+
+# Inventory shared by the GUI and the console
+inventory = InterfaceInventory()
@@ -0,0 +1,130 @@
+import string
+
+# Allowed separators between the hex digit pairs of a MAC address
+SEPARATORS = ":-."
+
+# Supported formats by string length: positions of the separators
+# 12: FFFFFFFFFFFF
+# 17: ff:ff:ff:ff:ff:ff, ff-ff-ff-ff-ff-ff, ff.ff.ff.ff.ff.ff
+_SEPARATOR_POSITIONS = {
+    12: (),
+    17: (2, 5, 8, 11, 14),
+}
+
+# Characters at the separator positions (text[2::3]) of a valid 17 character MAC address -> separator
+_RUN_SEPARATORS = {separator * 5: separator for separator in SEPARATORS}
+
+_HEX_DIGITS = frozenset(string.hexdigits)
+
+class MacAddressError(ValueError):
+    """
+    Raised for a MAC address in an unsupported format. The message names the offending character and position.
+    """
+
+def _describe_error(text):
+    """
+    Finds out why a MAC address could not be parsed. Only used on the error path.
+    """
+    if not isinstance(text, str):
+        return f"MAC address must be a string, not {type(text).__name__}"
+    separator_positions = _SEPARATOR_POSITIONS.get(len(text))
+    if separator_positions is None:
+        return f"Invalid MAC address length {len(text)} (expected 12 or 17 characters): {text!r}"
+    if separator_positions:
+        separator = text[separator_positions[0]]
+        if separator not in SEPARATORS:
+            return f"Invalid separator {separator!r} at position {separator_positions[0]}: {text!r}"
+        for position in separator_positions[1:]:
+            if text[position] != separator:
+                return f"Inconsistent separator {text[position]!r} at position {position}, expected {separator!r}: {text!r}"
+    for position, char in enumerate(text):
+        if position not in separator_positions and char not in _HEX_DIGITS:
+            return f"Invalid hex digit {char!r} at position {position}: {text!r}"
+    return f"Invalid MAC address: {text!r}"
+
+def _parse_bytes(text):
+    """
+    Parses a MAC address into its 6 bytes in a single pass, or returns None if it has an unsupported format.
+    """
+    try:
+        if len(text) == 17:
+            text = text.replace(_RUN_SEPARATORS[text[2::3]], "")
+        # A separator between the digits shortens the string, whitespace that fromhex would skip
+        # leaves less than 12 digits, so length 12 plus 6 decoded bytes means 12 hex digits
+        if len(text) != 12:
+            return None
+        mac_bytes = bytes.fromhex(text)
+    except (AttributeError, KeyError, ValueError, TypeError):
+        return None
+    return mac_bytes if len(mac_bytes) == 6 else None
+
+def parse_mac_bytes(text):
+    """
+    Parses a MAC address into its 6 bytes. See parse_mac for the supported formats.
+    
+    :param text: The MAC address string.
+    :return: The MAC address as 6 bytes.
+    :raises MacAddressError: If the MAC address has an unsupported format.
+    """
+    mac_bytes = _parse_bytes(text)
+    if mac_bytes is None:
+        raise MacAddressError(_describe_error(text))
+    return mac_bytes
+
+def parse_mac(text):
+    """
+    Parses a MAC address into its 48-bit integer value.
+    
+    Supported formats (upper or lower case):
+    ff.ff.ff.ff.ff.ff, ff-ff-ff-ff-ff-ff, ff:ff:ff:ff:ff:ff and FFFFFFFFFFFF.
+    The separator must be the same between all digit pairs.
+    
+    :param text: The MAC address string.
+    :return: The MAC address as an integer.
+    :raises MacAddressError: If the MAC address has an unsupported format.
+    """
+    return int.from_bytes(parse_mac_bytes(text), "big")
+
+def mac_to_bytes(value):
+    """
+    Converts a 48-bit MAC address integer into its 6 bytes.
+    """
+    return value.to_bytes(6, "big")
+
+def format_mac(value, separator=":"):
+    """
+    Formats a 48-bit MAC address integer as canonical lower case string, e.g. "fc:3f:db:0b:5c:bb".
+    
+    :param value: The MAC address as an integer.
+    :param separator: The separator between the digit pairs (default: ":").
+    """
+    return mac_to_bytes(value).hex(separator) if separator else f"{value:012x}"
+
+def parse_macs(texts, as_bytes=False):
+    """
+    Parses many MAC addresses.
+    
+    :param texts: An iterable of MAC address strings.
+    :param as_bytes: Return 6 byte values instead of 48-bit integers (default: False).
+    :return: A list of (value, error) tuples in input order. On success error is None,
+        otherwise value is None and error is the MacAddressError for this item.
+    """
+    results = []
+    append = results.append
+    fromhex = bytes.fromhex
+    from_bytes = int.from_bytes
+    run_separators = _RUN_SEPARATORS
+    for text in texts:
+        # Same checks as _parse_bytes, inlined to save a function call per MAC address
+        try:
+            digits = text.replace(run_separators[text[2::3]], "") if len(text) == 17 else text
+            mac_bytes = fromhex(digits) if len(digits) == 12 else None
+        except (AttributeError, KeyError, ValueError, TypeError):
+            mac_bytes = None
+        if mac_bytes is None or len(mac_bytes) != 6:
+            append((None, MacAddressError(_describe_error(text))))
+        elif as_bytes:
+            append((mac_bytes, None))
+        else:
+            append((from_bytes(mac_bytes, "big"), None))
+    return results
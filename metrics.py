@@ -0,0 +1,183 @@
+import threading
+from collections import deque
+
+# Registered sinks. The send path only checks this list, so without sinks instrumentation costs one truth test.
+sinks = []
+
+# Histogram buckets for the send latency in seconds and for the batch size
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+BATCH_SIZE_BUCKETS = (1, 10, 100, 1000, 10000, 100000)
+
+class MetricsSink:
+    """
+    Base class for metric sinks. Subclasses override the methods they are interested in.
+    """
+    def record_send(self, interface, sent, failed, seconds):
+        """
+        Called after packets were sent through an interface.
+        
+        :param interface: The interface IP or name, "default" for the default route.
+        :param sent: The number of packets sent.
+        :param failed: The number of packets that could not be sent.
+        :param seconds: The time the send took.
+        """
+
+    def record_batch(self, size):
+        """
+        Called for every batch sent with send_magic_packets.
+        """
+
+    def record_span(self, name, start, seconds, attributes):
+        """
+        Called for every instrumented call, with its wall clock start time, duration and attributes.
+        """
+
+def add_sink(sink):
+    """
+    Registers a sink. Returns the sink.
+    """
+    sinks.append(sink)
+    return sink
+
+def remove_sink(sink):
+    """
+    Unregisters a sink.
+    """
+    sinks.remove(sink)
+
+def record_send(interface, sent, failed, seconds):
+    for sink in sinks:
+        sink.record_send(interface or "default", sent, failed, seconds)
+
+def record_batch(size):
+    for sink in sinks:
+        sink.record_batch(size)
+
+def record_span(name, start, seconds, **attributes):
+    for sink in sinks:
+        sink.record_span(name, start, seconds, attributes)
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels}le="+Inf"}} {self.count}')
+        labels = labels.rstrip(",")
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.sum}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class PrometheusSink(MetricsSink):
+    """
+    Collects counters and histograms and renders them in the Prometheus text format.
+    
+    Metrics: wol_packets_sent_total and wol_packets_failed_total per interface,
+    wol_send_duration_seconds per interface and wol_batch_size. Thread-safe.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sent = {}
+        self._failed = {}
+        self._latency = {}
+        self._batch_size = _Histogram(BATCH_SIZE_BUCKETS)
+
+    def record_send(self, interface, sent, failed, seconds):
+        with self._lock:
+            self._sent[interface] = self._sent.get(interface, 0) + sent
+            self._failed[interface] = self._failed.get(interface, 0) + failed
+            histogram = self._latency.get(interface)
+            if histogram is None:
+                histogram = self._latency[interface] = _Histogram(LATENCY_BUCKETS)
+            histogram.observe(seconds)
+
+    def record_batch(self, size):
+        with self._lock:
+            self._batch_size.observe(size)
+
+    def render(self):
+        """
+        Returns all metrics in the Prometheus text exposition format.
+        """
+        with self._lock:
+            lines = [
+                "# HELP wol_packets_sent_total Magic Packets sent.",
+                "# TYPE wol_packets_sent_total counter",
+            ]
+            lines += [f'wol_packets_sent_total{{interface="{_escape(interface)}"}} {value}' for interface, value in self._sent.items()]
+            lines += [
+                "# HELP wol_packets_failed_total Magic Packets that could not be sent.",
+                "# TYPE wol_packets_failed_total counter",
+            ]
+            lines += [f'wol_packets_failed_total{{interface="{_escape(interface)}"}} {value}' for interface, value in self._failed.items()]
+            lines += [
+                "# HELP wol_send_duration_seconds Duration of a send call.",
+                "# TYPE wol_send_duration_seconds histogram",
+            ]
+            for interface, histogram in self._latency.items():
+                lines += histogram.render("wol_send_duration_seconds", f'interface="{_escape(interface)}",')
+            lines += [
+                "# HELP wol_batch_size Number of MAC addresses per batch.",
+                "# TYPE wol_batch_size histogram",
+            ]
+            lines += self._batch_size.render("wol_batch_size", "")
+        return "\n".join(lines) + "\n"
+
+class SpanRecorder(MetricsSink):
+    """
+    Keeps the most recent trace spans as (name, start, seconds, attributes) tuples.
+    
+    :param maxlen: The number of spans kept (default: 1000).
+    """
+    def __init__(self, maxlen=1000):
+        self.spans = deque(maxlen=maxlen)
+
+    def record_span(self, name, start, seconds, attributes):
+        self.spans.append((name, start, seconds, attributes))
+
+def serve_prometheus(sink, host="127.0.0.1", port=9101):
+    """
+    Serves the metrics of a PrometheusSink at http://host:port/metrics on a daemon thread.
+    
+    :return: The HTTP server, call shutdown() to stop it.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Only needed when metrics are served
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = sink.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Keep the console quiet
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,69 @@
+import errno
+import select
+import socket
+
+# EtherType for Wake-on-LAN frames
+ETHERTYPE_WAKE_ON_LAN = 0x0842
+
+BROADCAST_MAC = b'\xff' * 6
+
+class RawEthernetSender:
+    """
+    Sends Wake-on-LAN Magic Packets as raw Ethernet frames (EtherType 0x0842) on a named interface.
+    
+    Needs Linux (AF_PACKET) and the CAP_NET_RAW capability (e.g. root). The raw socket stays open
+    until close() is called, so it can be reused for a whole batch. Can be used as a context manager.
+    
+    :param interface_name: The name of the network interface, e.g. "eth0".
+    :param destination_mac: The 6 byte destination MAC address of the frames (default: broadcast).
+    """
+    def __init__(self, interface_name, destination_mac=BROADCAST_MAC):
+        if not hasattr(socket, "AF_PACKET"):
+            raise OSError("Raw Ethernet transport is only available on Linux")
+        self.interface_name = interface_name
+        self.sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETHERTYPE_WAKE_ON_LAN))
+        try:
+            self.sock.bind((interface_name, ETHERTYPE_WAKE_ON_LAN))
+            source_mac = self.sock.getsockname()[4]
+        except OSError:
+            self.sock.close()
+            raise
+        self._header = destination_mac + source_mac + ETHERTYPE_WAKE_ON_LAN.to_bytes(2, "big")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def send(self, magic_packet):
+        """
+        Sends one Magic Packet as an Ethernet frame. Waits while the transmit queue of the NIC is full.
+        
+        :param magic_packet: The Magic Packet (bytes or memoryview).
+        """
+        frame = self._header + bytes(magic_packet)
+        while True:
+            try:
+                self.sock.send(frame)
+                return
+            except OSError as e:
+                if e.errno not in (errno.ENOBUFS, errno.EAGAIN):
+                    raise
+                # The queue is full, wait until the socket is writable again
+                select.select([], [self.sock], [], 0.01)
+
+    def send_many(self, magic_packets):
+        """
+        Sends many Magic Packets back to back through the open socket.
+        
+        :param magic_packets: An iterable of Magic Packets.
+        """
+        for magic_packet in magic_packets:
+            self.send(magic_packet)
+
+    def close(self):
+        """
+        Closes the raw socket.
+        """
+        self.sock.close()
@@ -0,0 +1,399 @@
+import argparse
+import hashlib
+import hmac
+import selectors
+import signal
+import socket
+import struct
+import time
+from collections import OrderedDict, namedtuple
+
+import metrics
+from interfaces import directed_broadcast, inventory
+from scheduler import TokenBucket
+from wol import MAGIC_PACKET_SIZE, create_magic_packet, open_broadcast_socket
+
+# Ports Magic Packets are usually sent to: discard (9) and echo (7)
+LISTEN_PORTS = (9, 7)
+# Default port for authenticated relay requests
+REQUEST_PORT = 4009
+# Accepted difference in seconds between the clock of a requester and of the relay
+MAX_CLOCK_SKEW = 30.0
+# Receive buffer of the listening sockets, absorbs bursts while the relay is sending
+RECEIVE_BUFFER_SIZE = 4 * 1024 * 1024
+# Per-source rate limiters kept at most, all are dropped when there are more
+MAX_SOURCES = 10000
+
+SYNC_STREAM = b'\xff' * 6
+# Relay request: time in milliseconds since the epoch and MAC address, followed by an HMAC-SHA256 of both
+_REQUEST = struct.Struct("!Q6s")
+REQUEST_SIZE = _REQUEST.size + hashlib.sha256().digest_size
+
+# Output of the relay: broadcast IP address and port, sent through the interface with interface_ip (None for any)
+RelayOutput = namedtuple("RelayOutput", ["interface_ip", "broadcast_ip", "port"])
+
+def find_magic_mac(data):
+    """
+    Returns the 6 byte MAC address of the Magic Packet in a datagram, or None if it has none.
+
+    The Magic Packet can be anywhere in the datagram (e.g. after a header) and can be followed by a SecureOn password.
+    """
+    index = 0 if data[:6] == SYNC_STREAM else data.find(SYNC_STREAM)
+    while index != -1 and index + MAGIC_PACKET_SIZE <= len(data):
+        # A MAC address starting with ff bytes extends the sync stream, the first match that repeats 16 times wins
+        mac = data[index + 6:index + 12]
+        if data[index + 6:index + MAGIC_PACKET_SIZE] == mac * 16:
+            return bytes(mac)
+        index = data.find(SYNC_STREAM, index + 1)
+    return None
+
+def make_relay_request(key, mac_address, timestamp=None):
+    """
+    Builds an authenticated relay request for a MAC address.
+
+    :param key: The shared key (bytes).
+    :param mac_address: The MAC address of the target device.
+    :param timestamp: The time in seconds since the epoch (default: now).
+    """
+    mac = create_magic_packet(mac_address)[6:12]
+    milliseconds = int((time.time() if timestamp is None else timestamp) * 1000)
+    message = _REQUEST.pack(milliseconds, mac)
+    return message + hmac.new(key, message, hashlib.sha256).digest()
+
+def parse_relay_request(key, data, now=None, max_skew=MAX_CLOCK_SKEW):
+    """
+    Checks a relay request and returns its 6 byte MAC address, or None if it is malformed, not
+    signed with the key or too old.
+    """
+    if len(data) != REQUEST_SIZE:
+        return None
+    message, signature = data[:_REQUEST.size], data[_REQUEST.size:]
+    if not hmac.compare_digest(hmac.new(key, message, hashlib.sha256).digest(), signature):
+        return None
+    milliseconds, mac = _REQUEST.unpack(message)
+    if abs((time.time() if now is None else now) - milliseconds / 1000) > max_skew:
+        return None
+    return mac
+
+def parse_output(text, port=9, routing=None):
+    """
+    Parses an output given as BROADCAST_IP[:PORT][@INTERFACE_IP] or SUBNET/PREFIX[:PORT][@INTERFACE_IP].
+
+    A subnet is sent to through the local interface in that subnet and its broadcast address if routing
+    (a RoutingTable) knows one, otherwise to the directed broadcast address of the subnet.
+
+    :raises ValueError: If the output is malformed.
+    """
+    target, _, interface_ip = text.partition("@")
+    address, _, output_port = target.partition(":")
+    output_port = int(output_port) if output_port else port
+    if "/" not in address:
+        return RelayOutput(interface_ip or None, address, output_port)
+    if routing is not None:
+        routed_interface_ip, broadcast_ip = routing.route(address, None, None)
+        if broadcast_ip:
+            return RelayOutput(interface_ip or routed_interface_ip, broadcast_ip, output_port)
+    network_address, _, prefix_length = address.partition("/")
+    broadcast_ip = directed_broadcast(network_address, prefix_length)
+    if broadcast_ip is None:
+        raise ValueError(f"Subnet {address} has no broadcast address")
+    return RelayOutput(interface_ip or None, broadcast_ip, output_port)
+
+def _local_addresses(destinations):
+    """
+    Returns the local IPv4 addresses that packets to the destinations (ip, port) are sent from: the addresses
+    of the network interfaces (if psutil is installed) and the source addresses the routing table picks.
+    """
+    addresses = set()
+    try:
+        addresses.update(address.address for address in inventory.addresses())
+    except ImportError:
+        pass
+    for destination in destinations:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            try:
+                sock.connect(destination)  # Sends nothing, only picks the route and the source address
+            except OSError:
+                continue
+            addresses.add(sock.getsockname()[0])
+    return addresses
+
+class Relay:
+    """
+    Relays Wake-on-LAN Magic Packets from one broadcast domain into others.
+
+    Listens for Magic Packets on the listen ports and, with a key, for authenticated relay requests
+    (see make_relay_request) on the request port, and sends them again to all outputs. Every output
+    interface gets one non-blocking socket. A MAC address is relayed at most once per window seconds,
+    rate limits drop packets above rate packets/s in total and source_rate packets/s per source IP.
+    The relay runs in one thread: call serve_forever(), and stop() from another thread to end it.
+
+    :param outputs: The RelayOutput tuples to send to.
+    :param listen_ip: The IP address to listen on (default: all). Broadcasts are only received on all addresses.
+    :param listen_ports: The ports to listen for Magic Packets on (default: 9 and 7, empty for none).
+    :param key: The shared key for relay requests (bytes, optional).
+    :param request_port: The port for relay requests (default: 4009, only with a key).
+    :param window: The seconds a MAC address is not relayed again (default: 1.0).
+    :param rate: The maximum packets per second relayed in total (optional).
+    :param source_rate: The maximum packets per second relayed per source IP (optional).
+    :param listen_device: Only receive on this network interface, e.g. "eth0" (Linux only, needs root).
+    """
+    def __init__(self, outputs, listen_ip="0.0.0.0", listen_ports=LISTEN_PORTS, key=None, request_port=REQUEST_PORT,
+                 window=1.0, rate=None, source_rate=None, listen_device=None):
+        self.window = window
+        self.key = key
+        self.stats = {"received": 0, "relayed": 0, "duplicates": 0, "rate_limited": 0, "invalid": 0,
+                      "unauthenticated": 0, "looped": 0, "send_errors": 0}
+        # Limits, not pacing: up to one second of packets may arrive at once
+        self._bucket = TokenBucket(rate, max(rate, 1)) if rate else None
+        self._source_rate = source_rate
+        self._source_buckets = {}
+        self._recent = OrderedDict()  # MAC -> time it was relayed, oldest first
+        self._seen_requests = OrderedDict()  # Signatures of relay requests -> time received, against replays
+        self._selector = selectors.DefaultSelector()
+        self._running = False
+        self._sockets = []
+        try:
+            self._open_outputs(outputs)
+            for port in listen_ports:
+                self._listen(listen_ip, port, listen_device, False)
+            if key is not None:
+                self._listen(listen_ip, request_port, listen_device, True)
+        except OSError:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _open_outputs(self, outputs):
+        sockets = {}  # interface_ip -> socket
+        self._outputs = []
+        self._own_addresses = set()
+        for output in outputs:
+            sock = sockets.get(output.interface_ip)
+            if sock is None:
+                sock = sockets[output.interface_ip] = open_broadcast_socket(output.interface_ip)
+                self._sockets.append(sock)
+                if not output.interface_ip:
+                    sock.bind(("", 0))  # Bound now so its port is known for the loop detection
+                sock.setblocking(False)
+                self._own_addresses.add(sock.getsockname())
+            self._outputs.append((sock, (output.broadcast_ip, output.port), output.interface_ip))
+        # Ports of the output sockets bound to all addresses, their packets can come from any local address
+        self._own_ports = {port for ip, port in self._own_addresses if ip == "0.0.0.0"}
+        self._local_ips = _local_addresses(
+            [address for _, address, interface_ip in self._outputs if not interface_ip]
+        ) if self._own_ports else set()
+
+    def _is_own(self, source):
+        """
+        Returns True if source (ip, port) is one of the output sockets of this relay.
+        """
+        if source in self._own_addresses:
+            return True
+        # A remote sender may use the same port, only local source addresses are this relay
+        return source[1] in self._own_ports and (source[0] in self._local_ips or source[0].startswith("127."))
+
+    def _listen(self, listen_ip, port, listen_device, is_request_port):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sockets.append(sock)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER_SIZE)
+        if listen_device:
+            sock.setsockopt(socket.SOL_SOCKET, getattr(socket, "SO_BINDTODEVICE", 25), listen_device.encode())
+        sock.bind((listen_ip, port))
+        sock.setblocking(False)
+        self._selector.register(sock, selectors.EVENT_READ, is_request_port)
+
+    def addresses(self):
+        """
+        Returns the (ip, port) addresses the relay listens on.
+        """
+        return [key.fileobj.getsockname() for key in self._selector.get_map().values()]
+
+    def handle(self, data, source):
+        """
+        Relays a datagram with a Magic Packet received from source (ip, port).
+
+        :return: True if it was relayed.
+        """
+        self.stats["received"] += 1
+        if self._is_own(source):
+            self.stats["looped"] += 1  # Sent by this relay to an output the relay listens on
+            return False
+        mac = find_magic_mac(data)
+        if mac is None:
+            self.stats["invalid"] += 1
+            return False
+        return self._relay(mac, data, source[0])
+
+    def handle_request(self, data, source):
+        """
+        Relays the Magic Packet of an authenticated relay request received from source (ip, port).
+
+        :return: True if it was relayed.
+        """
+        self.stats["received"] += 1
+        mac = parse_relay_request(self.key, data) if self.key is not None else None
+        if mac is None:
+            self.stats["unauthenticated"] += 1
+            return False
+        now = time.monotonic()
+        _expire(self._seen_requests, now - MAX_CLOCK_SKEW * 2)
+        signature = bytes(data[_REQUEST.size:])
+        if signature in self._seen_requests:
+            self.stats["unauthenticated"] += 1  # Replayed request
+            return False
+        self._seen_requests[signature] = now
+        return self._relay(mac, SYNC_STREAM + mac * 16, source[0])
+
+    def _relay(self, mac, data, source_ip):
+        now = time.monotonic()
+        _expire(self._recent, now - self.window)
+        if mac in self._recent:
+            self.stats["duplicates"] += 1
+            return False
+        if not self._allowed(source_ip):
+            self.stats["rate_limited"] += 1
+            return False
+        self._recent[mac] = now
+        instrumented = bool(metrics.sinks)
+        for sock, address, interface_ip in self._outputs:
+            start = time.perf_counter() if instrumented else None
+            try:
+                sock.sendto(data, address)
+                failed = 0
+            except OSError:
+                self.stats["send_errors"] += 1
+                failed = 1
+            if instrumented:
+                metrics.record_send(interface_ip, 1 - failed, failed, time.perf_counter() - start)
+        self.stats["relayed"] += 1
+        return True
+
+    def _allowed(self, source_ip):
+        if self._source_rate:
+            bucket = self._source_buckets.get(source_ip)
+            if bucket is None:
+                if len(self._source_buckets) >= MAX_SOURCES:
+                    self._source_buckets.clear()
+                bucket = self._source_buckets[source_ip] = TokenBucket(self._source_rate, max(self._source_rate, 1))
+            if not bucket.try_acquire():
+                return False
+        return self._bucket is None or self._bucket.try_acquire()
+
+    def poll(self, timeout=None):
+        """
+        Waits up to timeout seconds for datagrams and relays all that are ready.
+        """
+        for key, _ in self._selector.select(timeout):
+            sock = key.fileobj
+            handle = self.handle_request if key.data else self.handle
+            for _ in range(256):  # Drain the socket, but let the other sockets have a turn
+                try:
+                    data, source = sock.recvfrom(2048)
+                except (BlockingIOError, InterruptedError):
+                    break
+                except OSError:
+                    continue  # e.g. ICMP port unreachable of an earlier send, reported on Windows
+                handle(data, source)
+
+    def serve_forever(self, poll_interval=0.5):
+        """
+        Relays packets until stop() is called.
+        """
+        self._running = True
+        while self._running:
+            self.poll(poll_interval)
+
+    def stop(self):
+        """
+        Ends serve_forever() within its poll interval.
+        """
+        self._running = False
+
+    def close(self):
+        """
+        Closes all sockets.
+        """
+        self._selector.close()
+        for sock in self._sockets:
+            sock.close()
+        self._sockets = []
+
+def _expire(entries, oldest):
+    """
+    Removes the entries of an OrderedDict of times (oldest first) older than oldest.
+    """
+    while entries:
+        key, added = next(iter(entries.items()))
+        if added >= oldest:
+            return
+        del entries[key]
+
+def _read_key(path):
+    with open(path, "rb") as file:
+        key = file.read().strip()
+    if not key:
+        raise ValueError(f"The key file {path} is empty")
+    return key
+
+def relay_main(argv=None):
+    """
+    Console command "relay": relays Magic Packets into other subnets, or sends a relay request.
+    """
+    parser = argparse.ArgumentParser(prog="wol.py relay", description="Relays Wake-on-LAN Magic Packets into other subnets.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve_parser = subparsers.add_parser("serve", help="Runs the relay.")
+    serve_parser.add_argument("--target", action="append", required=True, metavar="OUTPUT", help="Where to send the packets: BROADCAST_IP[:PORT][@INTERFACE_IP] or SUBNET/PREFIX[:PORT][@INTERFACE_IP]. Can be repeated.")
+    serve_parser.add_argument("--listen", default="0.0.0.0", help="The IP address to listen on (default: 0.0.0.0, needed to receive broadcasts).")
+    serve_parser.add_argument("--listen_ports", type=int, nargs="*", default=list(LISTEN_PORTS), help="The ports to listen for Magic Packets on (default: 9 7).")
+    serve_parser.add_argument("--listen_device", help="Only receive on this network interface, e.g. eth0 (Linux only, needs root).")
+    serve_parser.add_argument("--port", type=int, default=9, help="The default port of the targets (default: 9).")
+    serve_parser.add_argument("--key_file", help="File with the shared key for authenticated relay requests (optional).")
+    serve_parser.add_argument("--request_port", type=int, default=REQUEST_PORT, help=f"The port for relay requests (default: {REQUEST_PORT}).")
+    serve_parser.add_argument("--window", type=float, default=1.0, help="The seconds a MAC address is not relayed again (default: 1.0).")
+    serve_parser.add_argument("--rate", type=float, help="The maximum packets per second relayed (optional).")
+    serve_parser.add_argument("--source_rate", type=float, help="The maximum packets per second relayed per source IP (optional).")
+    request_parser = subparsers.add_parser("request", help="Sends an authenticated relay request.")
+    request_parser.add_argument("relay", metavar="HOST[:PORT]", help=f"The relay (default port: {REQUEST_PORT}).")
+    request_parser.add_argument("mac_address", help="The MAC address of the target device.")
+    request_parser.add_argument("--key_file", required=True, help="File with the shared key.")
+    args = parser.parse_args(argv)
+
+    key = _read_key(args.key_file) if args.key_file else None
+    if args.command == "request":
+        host, _, port = args.relay.partition(":")
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.sendto(make_relay_request(key, args.mac_address), (host, int(port or REQUEST_PORT)))
+        print(f"Relay request for {args.mac_address} sent to {host}:{port or REQUEST_PORT}")
+        return
+
+    try:
+        from routing import RoutingTable
+        routing = RoutingTable.from_inventory()
+    except ImportError:
+        routing = None  # psutil is not installed, subnets get their directed broadcast address
+    try:
+        outputs = [parse_output(target, args.port, routing) for target in args.target]
+    except ValueError as e:
+        parser.error(str(e))
+    with Relay(outputs, args.listen, args.listen_ports, key, args.request_port, args.window, args.rate,
+               args.source_rate, args.listen_device) as relay:
+        listening = ", ".join(f"{ip}:{port}" for ip, port in relay.addresses())
+        targets = ", ".join(f"{output.broadcast_ip}:{output.port} (Interface: {output.interface_ip})" for output in outputs)
+        print(f"Relaying from {listening} to {targets}", flush=True)
+        signal.signal(signal.SIGTERM, lambda signum, frame: relay.stop())  # Stopped by a service manager
+        try:
+            relay.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        print(", ".join(f"{name} {count}" for name, count in relay.stats.items()), flush=True)
+
+if __name__ == "__main__":
+    relay_main()
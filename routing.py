@@ -0,0 +1,93 @@
+import ipaddress
+
+from interfaces import directed_broadcast, inventory
+
+class RoutingTable:
+    """
+    Longest-prefix-match table over the IPv4 subnets of the local network interfaces.
+    
+    Finds the interface and broadcast address to wake a device whose last IP address or subnet
+    is known. The index holds one dict per prefix length, a lookup masks the address once per
+    prefix length from the longest to the shortest.
+    
+    :param addresses: The InterfaceAddress tuples of the local interfaces (see interfaces.py).
+    """
+    def __init__(self, addresses):
+        self._index = {}  # prefix length -> {network address as int: InterfaceAddress}
+        for address in addresses:
+            if not address.netmask or address.is_up is False:
+                continue
+            network = ipaddress.IPv4Network(f"{address.address}/{address.netmask}", strict=False)
+            self._index.setdefault(network.prefixlen, {}).setdefault(int(network.network_address), address)
+        self._prefix_lengths = sorted(self._index, reverse=True)
+
+    @classmethod
+    def from_inventory(cls, interface_inventory=inventory):
+        """
+        Builds the table from the (cached) interface inventory.
+        """
+        return cls(interface_inventory.addresses())
+
+    def lookup(self, ip):
+        """
+        Returns the InterfaceAddress of the most specific local subnet containing ip, or None.
+        
+        :param ip: An IPv4 address ("192.168.1.20") or subnet ("192.168.1.0/24"). A subnet only
+            matches an interface subnet of the same size or larger.
+        """
+        network = ipaddress.IPv4Network(ip, strict=False)
+        value = int(network.network_address)
+        for prefix_length in self._prefix_lengths:
+            if prefix_length > network.prefixlen:
+                continue
+            mask = (0xFFFFFFFF << (32 - prefix_length)) & 0xFFFFFFFF
+            address = self._index[prefix_length].get(value & mask)
+            if address is not None:
+                return address
+        return None
+
+    def route(self, ip, broadcast_ip='255.255.255.255', interface_ip=None):
+        """
+        Returns the (interface_ip, broadcast_ip) to wake a device with this IP address or subnet.
+        
+        A device in a local subnet is woken through that interface and its broadcast address. A device
+        in a remote subnet (given as CIDR) gets the directed broadcast of that subnet. Otherwise the
+        defaults are returned.
+        """
+        if not ip:
+            return interface_ip, broadcast_ip
+        try:
+            address = self.lookup(ip)
+        except ValueError:
+            return interface_ip, broadcast_ip
+        if address is not None:
+            return address.address, address.broadcast or broadcast_ip
+        network = ipaddress.IPv4Network(ip, strict=False)
+        if "/" in ip and network.prefixlen < 31:
+            return interface_ip, directed_broadcast(network.network_address, network.netmask)
+        return interface_ip, broadcast_ip
+
+    def group(self, devices, broadcast_ip='255.255.255.255', interface_ip=None):
+        """
+        Groups devices by the (interface_ip, broadcast_ip) they are sent through.
+        
+        :param devices: Device records with "mac" and optional "ip" (address or CIDR subnet).
+        :return: A dict {(interface_ip, broadcast_ip): [device, ...]}.
+        """
+        groups = {}
+        for device in devices:
+            key = self.route(device.get("ip"), broadcast_ip, interface_ip)
+            groups.setdefault(key, []).append(device)
+        return groups
+
+    def targets(self, devices, broadcast_ip='255.255.255.255', port=9, interface_ip=None):
+        """
+        Turns devices into target tuples for wol.send_magic_packets, routed by their IP address or subnet.
+        
+        send_magic_packets opens one socket per (interface_ip, broadcast_ip, port) bucket.
+        """
+        targets = []
+        for device in devices:
+            device_interface_ip, device_broadcast_ip = self.route(device.get("ip"), broadcast_ip, interface_ip)
+            targets.append((device["mac"], device_broadcast_ip, port, device_interface_ip))
+        return targets
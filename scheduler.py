@@ -0,0 +1,196 @@
+import argparse
+import time
+
+from device_store import DB_FILE, open_store
+from mac_address import MacAddressError, parse_mac_bytes
+from wol import SocketPool, _normalize_target, packet_cache
+
+class TokenBucket:
+    """
+    Token bucket rate limiter.
+    
+    :param rate: The number of tokens added per second.
+    :param burst: The maximum number of tokens that can be saved up (default: 1, evenly spaced tokens).
+    """
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = self.burst
+        self._last = time.monotonic()
+
+    def acquire(self, tokens=1):
+        """
+        Takes tokens from the bucket, sleeping until enough tokens are available.
+        """
+        while not self.try_acquire(tokens):
+            time.sleep((tokens - self._tokens) / self.rate)
+
+    def try_acquire(self, tokens=1):
+        """
+        Takes tokens from the bucket if enough tokens are available, without waiting.
+        
+        :return: True if the tokens were taken.
+        """
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return True
+        return False
+
+def _target_from_record(target, broadcast_ip, port, interface_ip):
+    """
+    Turns a target into a (priority, (mac_address, broadcast_ip, port, interface_ip)) tuple.
+    
+    A target is a MAC address, a target tuple (see wol.send_magic_packets) or a device record
+    dict with "mac" and the optional keys "priority", "broadcast_ip", "port" and "interface_ip".
+    """
+    if isinstance(target, dict):
+        normalized = _normalize_target(
+            (target["mac"], target.get("broadcast_ip"), target.get("port"), target.get("interface_ip")),
+            broadcast_ip, port, interface_ip,
+        )
+        return target.get("priority") or 0, normalized
+    return 0, _normalize_target(target, broadcast_ip, port, interface_ip)
+
+class WaveScheduler:
+    """
+    Wakes large numbers of devices in paced waves instead of one tight loop.
+    
+    The targets are ordered by priority (higher first) and split into waves of at most wave_size
+    devices with wave_delay seconds in between. Within a wave the packets are limited to rate
+    packets per second by a token bucket. All packets go through one SocketPool.
+    
+    :param rate: The maximum packets per second, None for no limit (default: None).
+    :param wave_size: The maximum number of devices per wave, None for a single wave (default: None).
+    :param wave_delay: The delay in seconds between two waves (default: 0).
+    :param broadcast_ip: The default broadcast IP address (default: 255.255.255.255).
+    :param port: The default target port (default: 9).
+    :param interface_ip: The default IP address of the network interface (optional).
+    :param progress: Callback progress(done, total, wave_results) called after every wave (optional).
+    :param pool: The SocketPool to send through (default: a new pool).
+    """
+    def __init__(self, rate=None, wave_size=None, wave_delay=0.0, broadcast_ip='255.255.255.255', port=9,
+                 interface_ip=None, progress=None, pool=None):
+        self.bucket = TokenBucket(rate) if rate else None
+        self.wave_size = wave_size
+        self.wave_delay = wave_delay
+        self.broadcast_ip = broadcast_ip
+        self.port = port
+        self.interface_ip = interface_ip
+        self.progress = progress
+        self.pool = pool if pool is not None else SocketPool()
+
+    def plan(self, targets):
+        """
+        Orders the targets by priority and splits them into waves.
+        
+        Like in send_magic_packets, targets for the same device (by canonical MAC address) with the same
+        send options are planned only once, at the highest priority.
+        
+        :param targets: An iterable of MAC addresses, target tuples or device record dicts.
+        :return: A list of waves, each a list of (mac_address, broadcast_ip, port, interface_ip) tuples.
+        """
+        return self._plan(targets)[0]
+
+    def _plan(self, targets):
+        """
+        Returns the waves and a dict {first target: MAC addresses of the skipped duplicates}.
+        """
+        prioritized = [_target_from_record(target, self.broadcast_ip, self.port, self.interface_ip) for target in targets]
+        prioritized.sort(key=lambda item: -item[0])  # Stable, keeps the input order within a priority
+        ordered = []
+        first_targets = {}  # (MAC bytes, broadcast_ip, port, interface_ip) -> first target
+        duplicates = {}
+        for _, target in prioritized:
+            try:
+                key = (parse_mac_bytes(target[0]), *target[1:])
+            except MacAddressError:
+                ordered.append(target)  # Fails in send_wave with the error of the MAC address
+                continue
+            first_target = first_targets.setdefault(key, target)
+            if first_target is target:
+                ordered.append(target)
+            else:
+                duplicates.setdefault(first_target, []).append(target[0])
+        size = self.wave_size or len(ordered) or 1
+        return [ordered[start:start + size] for start in range(0, len(ordered), size)], duplicates
+
+    def send_wave(self, wave):
+        """
+        Sends one wave, paced by the token bucket.
+        
+        :return: A list of (mac_address, error) tuples for the wave.
+        """
+        results = []
+        for mac_address, broadcast_ip, port, interface_ip in wave:
+            if self.bucket is not None:
+                self.bucket.acquire()
+            try:
+                self.pool.sendto(packet_cache.get(mac_address), (broadcast_ip, port), interface_ip)
+                results.append((mac_address, None))
+            except (ValueError, OSError) as e:
+                results.append((mac_address, e))
+        return results
+
+    def run(self, targets):
+        """
+        Wakes all targets wave by wave, sleeping wave_delay seconds between the waves.
+        
+        :param targets: An iterable of MAC addresses, target tuples or device record dicts.
+        :return: A list of (mac_address, error) tuples in send order, one per target. A duplicate
+            target is not sent again and shares the result of the first target for the device.
+        """
+        waves, duplicates = self._plan(targets)
+        total = sum(len(wave) for wave in waves) + sum(len(macs) for macs in duplicates.values())
+        results = []
+        for number, wave in enumerate(waves):
+            if number and self.wave_delay:
+                time.sleep(self.wave_delay)
+            wave_results = self.send_wave(wave)
+            if duplicates:
+                wave_results += [(mac_address, error) for target, (_, error) in zip(wave, wave_results)
+                                 for mac_address in duplicates.get(target, ())]
+            results.extend(wave_results)
+            if self.progress is not None:
+                self.progress(len(results), total, wave_results)
+        return results
+
+    def close(self):
+        """
+        Closes the sockets of the pool.
+        """
+        self.pool.close()
+
+def schedule_main(argv=None):
+    """
+    Console command "schedule": wakes all devices of the device store in paced waves.
+    """
+    parser = argparse.ArgumentParser(prog="wol.py schedule", description="Wakes all devices of the device store in paced waves.")
+    parser.add_argument("--db", default=DB_FILE, help=f"The device store (default: {DB_FILE}).")
+    parser.add_argument("--rate", type=float, help="The maximum packets per second (default: no limit).")
+    parser.add_argument("--wave_size", type=int, help="The maximum number of devices per wave (default: all at once).")
+    parser.add_argument("--wave_delay", type=float, default=0.0, help="The delay in seconds between waves (default: 0).")
+    parser.add_argument("--broadcast_ip", default="255.255.255.255", help="The broadcast IP address (default: 255.255.255.255).")
+    parser.add_argument("--port", type=int, default=9, help="The target port (default: 9).")
+    parser.add_argument("--interface_ip", help="The IP address of the network interface (optional).")
+
+    args = parser.parse_args(argv)
+
+    with open_store(args.db) as store:
+        devices = store.all()
+
+    def print_progress(done, total, wave_results):
+        failed = sum(1 for _, error in wave_results if error is not None)
+        print(f"{done}/{total} devices woken ({failed} failed in this wave)")
+
+    scheduler = WaveScheduler(args.rate, args.wave_size, args.wave_delay, args.broadcast_ip, args.port,
+                              args.interface_ip, progress=print_progress)
+    try:
+        scheduler.run(devices)
+    finally:
+        scheduler.close()
+
+if __name__ == "__main__":
+    schedule_main()
@@ -0,0 +1,218 @@
+import argparse
+import asyncio
+import errno
+import os
+import socket
+import struct
+import time
+
+# TCP ports probed by default: SSH, HTTP, Windows RPC/NetBIOS/SMB, HTTPS and RDP
+DEFAULT_PORTS = (22, 80, 135, 139, 443, 445, 3389)
+# Errors of a process or system without free file descriptors, raised instead of reporting the host as off
+_FD_EXHAUSTED = (errno.EMFILE, errno.ENFILE)
+
+async def _tcp_probe(host, port, timeout, limit=None):
+    """
+    Returns True if the host answered a TCP connect on the port, with an accept or a refusal.
+    """
+    if limit is not None:
+        async with limit:
+            return await _tcp_probe(host, port, timeout)
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except ConnectionRefusedError:
+        return True  # The host sent a reset, so it is powered on
+    except asyncio.TimeoutError:
+        return False
+    except OSError as e:
+        if e.errno in _FD_EXHAUSTED:
+            raise
+        return False
+    writer.close()
+    return True
+
+def _icmp_checksum(data):
+    if len(data) % 2:
+        data += b'\x00'
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+def _open_icmp_socket():
+    """
+    Opens a non-blocking ICMP socket: unprivileged ICMP datagram socket if allowed (Linux, macOS), raw socket otherwise.
+    
+    :raises PermissionError: If ICMP is not allowed for this process.
+    """
+    for sock_type in (socket.SOCK_DGRAM, socket.SOCK_RAW):
+        try:
+            sock = socket.socket(socket.AF_INET, sock_type, socket.IPPROTO_ICMP)
+        except OSError as e:
+            if e.errno in _FD_EXHAUSTED:
+                raise
+            continue
+        sock.setblocking(False)
+        return sock
+    raise PermissionError("ICMP echo needs privileges on this system")
+
+async def _icmp_probe(host, timeout, limit=None):
+    """
+    Returns True if the host answers an ICMP echo request, None if ICMP is not allowed.
+    """
+    if limit is not None:
+        async with limit:
+            return await _icmp_probe(host, timeout)
+    try:
+        sock = _open_icmp_socket()
+    except PermissionError:
+        return None
+    loop = asyncio.get_running_loop()
+    identifier = os.getpid() & 0xFFFF
+    header = struct.pack("!BBHHH", 8, 0, 0, identifier, 1)
+    payload = b"wake-on-lan status"
+    packet = struct.pack("!BBHHH", 8, 0, _icmp_checksum(header + payload), identifier, 1) + payload
+    try:
+        await loop.sock_sendto(sock, packet, (host, 0))
+        deadline = loop.time() + timeout
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            reply, address = await asyncio.wait_for(loop.sock_recvfrom(sock, 1024), remaining)
+            if sock.type == socket.SOCK_RAW:
+                reply = reply[(reply[0] & 0x0F) * 4:]  # Strip the IP header
+            if address[0] == host and reply[:1] == b'\x00':  # Echo reply from the host
+                return True
+    except (OSError, asyncio.TimeoutError):
+        return False
+    finally:
+        sock.close()
+
+async def probe_host(host, ports=DEFAULT_PORTS, timeout=1.0, icmp=False, limit=None):
+    """
+    Checks whether a host is powered on.
+    
+    All TCP ports are probed at the same time, any accept or refusal counts as powered on.
+    With icmp=True an ICMP echo request is sent as well, if the system allows it.
+    
+    :param host: The IP address or host name.
+    :param ports: The TCP ports to probe (default: DEFAULT_PORTS).
+    :param timeout: The timeout in seconds for the probes of this host (default: 1.0).
+    :param icmp: Also send an ICMP echo request (default: False).
+    :param limit: An asyncio.Semaphore shared by probes of many hosts, every open socket holds it (optional).
+    :return: True if the host is powered on, otherwise False.
+    :raises OSError: If the process or system has no free file descriptors (EMFILE, ENFILE).
+    """
+    probes = [asyncio.ensure_future(_tcp_probe(host, port, timeout, limit)) for port in ports]
+    if icmp:
+        probes.append(asyncio.ensure_future(_icmp_probe(host, timeout, limit)))
+    try:
+        for probe in asyncio.as_completed(probes):
+            if await probe:
+                return True
+        return False
+    finally:
+        for probe in probes:
+            probe.cancel()  # The first answer is enough
+
+class StatusProber:
+    """
+    Probes the power state of many hosts concurrently and caches the results.
+    
+    A cached state is reused for ttl seconds, so a table refresh does not probe again.
+    
+    :param ports: The TCP ports to probe (default: DEFAULT_PORTS).
+    :param timeout: The timeout in seconds per host (default: 1.0).
+    :param concurrency: The maximum number of probe sockets open at the same time (default: 256).
+    :param icmp: Also send ICMP echo requests if the system allows it (default: False).
+    :param ttl: Seconds a probed state is cached (default: 30).
+    """
+    def __init__(self, ports=DEFAULT_PORTS, timeout=1.0, concurrency=256, icmp=False, ttl=30):
+        self.ports = ports
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.icmp = icmp
+        self.ttl = ttl
+        self._cache = {}  # host -> (powered on, time of the probe)
+
+    def cached(self, host):
+        """
+        Returns the cached state of a host (True or False), or None if it is unknown or expired.
+        """
+        entry = self._cache.get(host)
+        if entry is None or time.monotonic() - entry[1] >= self.ttl:
+            return None
+        return entry[0]
+
+    def invalidate(self, host=None):
+        """
+        Removes the cached state of one host, or of all hosts if no host is given.
+        """
+        if host is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(host, None)
+
+    async def probe_many(self, hosts):
+        """
+        Returns the power state of every host, probing only the hosts without a fresh cached state.
+        
+        :param hosts: An iterable of IP addresses or host names.
+        :return: A dict {host: True or False}.
+        :raises OSError: If the process or system has no free file descriptors (EMFILE, ENFILE).
+        """
+        states = {}
+        missing = []
+        for host in hosts:
+            state = self.cached(host)
+            if state is None:
+                missing.append(host)
+            else:
+                states[host] = state
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def probe(host):
+            state = await probe_host(host, self.ports, self.timeout, self.icmp, semaphore)
+            self._cache[host] = (state, time.monotonic())
+            states[host] = state
+
+        await asyncio.gather(*(probe(host) for host in dict.fromkeys(missing)))
+        return states
+
+    def probe_many_sync(self, hosts):
+        """
+        Blocking version of probe_many for threads without an event loop.
+        """
+        return asyncio.run(self.probe_many(hosts))
+
+def status_main(argv=None):
+    """
+    Console command "status": shows the power state of hosts or of all devices of the device store.
+    """
+    parser = argparse.ArgumentParser(prog="wol.py status", description="Shows whether devices are powered on.")
+    parser.add_argument("hosts", nargs="*", help="IP addresses or host names (default: all devices with an IP address in the device store).")
+    parser.add_argument("--ports", type=int, nargs="+", default=list(DEFAULT_PORTS), help="The TCP ports to probe.")
+    parser.add_argument("--timeout", type=float, default=1.0, help="The timeout in seconds per host (default: 1.0).")
+    parser.add_argument("--concurrency", type=int, default=256, help="The number of probe sockets open at the same time (default: 256).")
+    parser.add_argument("--icmp", action="store_true", help="Also send ICMP echo requests (needs privileges on most systems).")
+    args = parser.parse_args(argv)
+
+    names = {}
+    hosts = args.hosts
+    if not hosts:
+        from device_store import open_store
+        with open_store() as store:
+            for device in store.all():
+                if device["ip"] and "/" not in device["ip"]:
+                    names[device["ip"]] = device["name"]
+        hosts = list(names)
+
+    prober = StatusProber(args.ports, args.timeout, args.concurrency, args.icmp)
+    try:
+        states = prober.probe_many_sync(hosts)
+    except OSError as e:
+        parser.exit(1, f"Probing the power state failed: {e}\n")
+    for host in hosts:
+        label = f"{host} ({names[host]})" if host in names else host
+        print(f"{label}: {'on' if states[host] else 'off'}")
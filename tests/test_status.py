@@ -0,0 +1,102 @@
+import asyncio
+import contextlib
+import errno
+import io
+import socket
+import time
+import unittest
+from unittest import mock
+
+import status
+from status import StatusProber, probe_host, status_main
+
+
+def listen(host="127.0.0.2"):
+    """
+    Opens a TCP listener on a free port of host.
+    """
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind((host, 0))
+    listener.listen()
+    return listener
+
+
+def free_port(host="127.0.0.2"):
+    """
+    Returns a port nothing listens on.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+class ProbeHostTest(unittest.TestCase):
+    def test_accepting_listener_is_on(self):
+        with listen() as listener:
+            port = listener.getsockname()[1]
+            self.assertTrue(asyncio.run(probe_host("127.0.0.2", [port], timeout=1.0)))
+
+    def test_refused_port_is_on(self):
+        self.assertTrue(asyncio.run(probe_host("127.0.0.2", [free_port()], timeout=1.0)))
+
+
+class StatusProberTest(unittest.TestCase):
+    def test_cached_state_is_not_probed_again(self):
+        calls = []
+
+        async def fake_probe_host(host, ports, timeout, icmp, limit):
+            calls.append(host)
+            return True
+
+        prober = StatusProber(ttl=0.2)
+        with mock.patch.object(status, "probe_host", fake_probe_host):
+            self.assertEqual(prober.probe_many_sync(["127.0.0.2"]), {"127.0.0.2": True})
+            self.assertEqual(prober.probe_many_sync(["127.0.0.2"]), {"127.0.0.2": True})
+            self.assertEqual(calls, ["127.0.0.2"])
+            self.assertTrue(prober.cached("127.0.0.2"))
+            time.sleep(0.25)
+            self.assertIsNone(prober.cached("127.0.0.2"))
+            prober.probe_many_sync(["127.0.0.2"])
+        self.assertEqual(calls, ["127.0.0.2", "127.0.0.2"])
+
+    def test_concurrency_limits_open_sockets(self):
+        open_sockets = [0, 0]  # Now, maximum
+
+        async def fake_open_connection(host, port):
+            open_sockets[0] += 1
+            open_sockets[1] = max(open_sockets)
+            try:
+                await asyncio.sleep(0.001)
+            finally:  # Also when the other probes of the host are cancelled
+                open_sockets[0] -= 1
+            raise ConnectionRefusedError
+
+        hosts = [f"127.0.1.{i}" for i in range(1, 51)]
+        prober = StatusProber(ports=(22, 80, 443), concurrency=10)
+        with mock.patch.object(status.asyncio, "open_connection", fake_open_connection):
+            states = prober.probe_many_sync(hosts)
+        self.assertEqual(states, dict.fromkeys(hosts, True))
+        self.assertLessEqual(open_sockets[1], 10)
+
+    def test_fd_exhaustion_is_raised(self):
+        async def fake_open_connection(host, port):
+            raise OSError(errno.EMFILE, "Too many open files")
+
+        with mock.patch.object(status.asyncio, "open_connection", fake_open_connection):
+            with self.assertRaises(OSError):
+                StatusProber().probe_many_sync(["127.0.0.2"])
+        self.assertIsNone(StatusProber().cached("127.0.0.2"))
+
+
+class StatusMainTest(unittest.TestCase):
+    def test_prints_state_per_host(self):
+        with listen() as listener:
+            port = listener.getsockname()[1]
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                status_main(["127.0.0.2", "--ports", str(port), "--timeout", "0.5"])
+        self.assertEqual(output.getvalue(), "127.0.0.2: on\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import argparse
+import asyncio
+import time
+from collections import namedtuple
+
+from status import DEFAULT_PORTS, probe_host
+from wol_async import AsyncWakeOnLan
+
+# Result of one device: woke is True if it answered a probe, time_to_wake the seconds from the first packet until then
+VerifyResult = namedtuple("VerifyResult", ["mac", "host", "woke", "time_to_wake", "attempts", "error"])
+
+def percentile(values, fraction):
+    """
+    Returns the nearest-rank percentile of sorted values, e.g. fraction=0.95 for p95, or None without values.
+    """
+    if not values:
+        return None
+    rank = max(int(-(-fraction * len(values) // 1)), 1)  # ceil(fraction * n), at least 1
+    return values[min(rank, len(values)) - 1]
+
+def summarize(results):
+    """
+    Summarizes a batch of VerifyResults.
+    
+    :return: A dict with total, woke, failed and the p50, p95 and p99 time-to-wake in seconds.
+    """
+    times = sorted(result.time_to_wake for result in results if result.woke)
+    return {
+        "total": len(results),
+        "woke": len(times),
+        "failed": len(results) - len(times),
+        "p50": percentile(times, 0.50),
+        "p95": percentile(times, 0.95),
+        "p99": percentile(times, 0.99),
+    }
+
+async def _wake_and_verify_one(engine, mac_address, host, broadcast_ip, port, interface_ip, retries, timeout,
+                               initial_delay, max_delay, probe_ports, probe_timeout, probe_limit):
+    start = time.monotonic()
+    attempt_timeout = timeout / (retries + 1)
+    attempts = 0
+    error = None
+    for attempt in range(retries + 1):
+        attempts += 1
+        try:
+            await engine.wake(mac_address, broadcast_ip, port, interface_ip)
+        except (ValueError, OSError, asyncio.TimeoutError) as e:
+            error = e
+            if isinstance(e, ValueError):
+                break  # An invalid MAC address will not get better
+        attempt_end = start + attempt_timeout * (attempt + 1)
+        delay = initial_delay
+        # Poll with exponential backoff until the host answers or this attempt is over
+        while time.monotonic() < attempt_end:
+            await asyncio.sleep(min(delay, max(attempt_end - time.monotonic(), 0)))
+            try:
+                if await probe_host(host, probe_ports, probe_timeout, limit=probe_limit):
+                    return VerifyResult(mac_address, host, True, time.monotonic() - start, attempts, None)
+            except OSError as e:  # No free file descriptors, the state of the host is unknown
+                return VerifyResult(mac_address, host, False, None, attempts, e)
+            delay = min(delay * 2, max_delay)
+    return VerifyResult(mac_address, host, False, None, attempts, error)
+
+async def wake_and_verify(targets, broadcast_ip='255.255.255.255', port=9, interface_ip=None, retries=2,
+                          timeout=120.0, initial_delay=1.0, max_delay=16.0, probe_ports=DEFAULT_PORTS,
+                          probe_timeout=1.0, concurrency=256):
+    """
+    Wakes devices and verifies that they came up.
+    
+    After sending the Magic Packet each device is probed (see status.probe_host) with exponential
+    backoff. If it does not answer, the packet is sent again, up to retries times. The timeout is
+    split evenly between the attempts.
+    
+    :param targets: An iterable of (mac_address, host) tuples or device records with "mac" and "ip".
+    :param broadcast_ip: The broadcast IP address (default: 255.255.255.255).
+    :param port: The target port (default: 9).
+    :param interface_ip: The IP address of the network interface (optional).
+    :param retries: How often the packet is sent again (default: 2).
+    :param timeout: The seconds to wait for a device in total (default: 120).
+    :param initial_delay: The seconds before the first probe (default: 1).
+    :param max_delay: The maximum seconds between two probes (default: 16).
+    :param probe_ports: The TCP ports probed (default: status.DEFAULT_PORTS).
+    :param probe_timeout: The timeout of one probe in seconds (default: 1).
+    :param concurrency: The maximum number of packets in flight and of probe sockets open at the same time (default: 256).
+    :return: A list of VerifyResults in input order.
+    """
+    pairs = [(target["mac"], target["ip"]) if isinstance(target, dict) else tuple(target) for target in targets]
+    probe_limit = asyncio.Semaphore(concurrency)
+    async with AsyncWakeOnLan(concurrency) as engine:
+        return await asyncio.gather(*(
+            _wake_and_verify_one(engine, mac_address, host, broadcast_ip, port, interface_ip, retries, timeout,
+                                 initial_delay, max_delay, probe_ports, probe_timeout, probe_limit)
+            for mac_address, host in pairs
+        ))
+
+def _format_seconds(value):
+    return "-" if value is None else f"{value:.1f} s"
+
+def verify_main(argv=None):
+    """
+    Console command "verify": wakes devices, waits until they answer and prints time-to-wake statistics.
+    """
+    parser = argparse.ArgumentParser(prog="wol.py verify", description="Wakes devices and verifies that they came up.")
+    parser.add_argument("targets", nargs="*", metavar="MAC@HOST", help="MAC address and IP address of a device (default: all devices with an IP address in the device store).")
+    parser.add_argument("--group", help="Only the devices of this group or tag of the device store.")
+    parser.add_argument("--broadcast_ip", default="255.255.255.255", help="The broadcast IP address (default: 255.255.255.255).")
+    parser.add_argument("--port", type=int, default=9, help="The target port (default: 9).")
+    parser.add_argument("--interface_ip", help="The IP address of the network interface (optional).")
+    parser.add_argument("--retries", type=int, default=2, help="How often the packet is sent again (default: 2).")
+    parser.add_argument("--timeout", type=float, default=120.0, help="The seconds to wait for a device (default: 120).")
+    parser.add_argument("--probe_ports", type=int, nargs="+", default=list(DEFAULT_PORTS), help="The TCP ports probed.")
+    args = parser.parse_args(argv)
+
+    targets = []
+    for target in args.targets:
+        mac_address, _, host = target.partition("@")
+        if not host:
+            parser.error(f"Expected MAC@HOST, got {target!r}")
+        targets.append((mac_address, host))
+    if not targets:
+        from device_store import open_store
+        with open_store() as store:
+            devices = store.members(args.group) if args.group else store.all()
+        targets = [device for device in devices if device["ip"] and "/" not in device["ip"]]
+
+    results = asyncio.run(wake_and_verify(targets, args.broadcast_ip, args.port, args.interface_ip, args.retries,
+                                          args.timeout, probe_ports=args.probe_ports))
+    for result in results:
+        state = f"up after {_format_seconds(result.time_to_wake)}" if result.woke else f"did not wake ({result.error or 'no answer'})"
+        print(f"{result.mac} ({result.host}): {state}, {result.attempts} packet(s)")
+    summary = summarize(results)
+    print(f"{summary['woke']}/{summary['total']} woke, {summary['failed']} failed, "
+          f"p50 {_format_seconds(summary['p50'])}, p95 {_format_seconds(summary['p95'])}, p99 {_format_seconds(summary['p99'])}")
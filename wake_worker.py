@@ -0,0 +1,106 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from wol import send_magic_packets
+
+class WakeWorker:
+    """
+    Sends Wake-on-LAN Magic Packets on background threads and queues the results.
+    
+    The results are (mac_address, error) tuples. GUI code polls them with results() from its
+    own thread (e.g. via Tk after()), so no widget is touched from a worker thread. expected,
+    done and failed count the results of the current run, a new run starts when nothing is in flight.
+    
+    :param pool: The SocketPool to send through (optional).
+    :param max_workers: The number of worker threads (default: 4).
+    """
+    def __init__(self, pool=None, max_workers=4):
+        self.pool = pool
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="wake")
+        self._results = queue.Queue()
+        self._lock = threading.Lock()
+        self.expected = 0
+        self.done = 0
+        self.failed = 0
+
+    def _expect(self, count):
+        with self._lock:
+            if self.done >= self.expected:
+                # Nothing in flight, start counting a new run
+                self.expected = 0
+                self.done = 0
+                self.failed = 0
+            self.expected += count
+
+    def _report(self, results):
+        self._results.put(list(results))
+
+    def wake_many(self, mac_addresses, broadcast_ip='255.255.255.255', port=9, interface_ip=None):
+        """
+        Queues a batch of Magic Packets to be sent on a worker thread through the pool (or one new socket per interface).
+        
+        :param mac_addresses: A list of MAC addresses or target tuples (see wol.send_magic_packets).
+        """
+        mac_addresses = list(mac_addresses)
+        self.submit(lambda report: report(send_magic_packets(mac_addresses, broadcast_ip, port, interface_ip,
+                                                             pool=self.pool)),
+                    len(mac_addresses))
+
+    def submit(self, job, count):
+        """
+        Runs job(report) on a worker thread. The job passes lists of (mac_address, error) tuples to report.
+        
+        :param job: The callable to run.
+        :param count: The number of results the job will report, for the progress.
+        """
+        self._expect(count)
+
+        reported = [0]
+
+        def report(results):
+            results = list(results)
+            reported[0] += len(results)
+            self._report(results)
+
+        def run():
+            try:
+                job(report)
+            except Exception as e:
+                # Count the results the job will never report as failed, so the run can finish
+                missing = max(count - reported[0], 0)
+                with self._lock:
+                    self.done += missing
+                    self.failed += missing
+                self._report([(None, e)])
+
+        self._executor.submit(run)
+
+    def results(self):
+        """
+        Returns all results queued since the last call, without blocking.
+        """
+        results = []
+        while True:
+            try:
+                batch = self._results.get_nowait()
+            except queue.Empty:
+                break
+            results.extend(batch)
+        with self._lock:
+            self.done += sum(1 for mac_address, _ in results if mac_address is not None)
+            self.failed += sum(1 for mac_address, error in results if mac_address is not None and error is not None)
+        return results
+
+    def busy(self):
+        """
+        Returns True while results are still expected.
+        """
+        with self._lock:
+            return self.done < self.expected
+
+    def shutdown(self):
+        """
+        Waits for the running jobs and stops the worker threads.
+        """
+        self._executor.shutdown(wait=True)
@@ -1,5 +1,23 @@
+import os
 import socket
-import argparse
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+from mac_address import parse_mac_bytes
+
+# Size of a Magic Packet: 6 bytes 0xFF followed by 16 repetitions of the 6 byte MAC address
+MAGIC_PACKET_SIZE = 102
+
+def _mac_to_bytes(mac_address):
+    """
+    Converts a MAC address string into its 6 bytes.
+    
+    :raises MacAddressError: A ValueError for MAC addresses in an unsupported format.
+    """
+    return parse_mac_bytes(mac_address)
 
 def create_magic_packet(mac_address):
     """
@@ -8,17 +26,172 @@ def create_magic_packet(mac_address):
     :param mac_address: The MAC address of the target device (e.g., "00:11:22:33:44:55").
     :return: The Magic Packet as a byte object.
     """
-    # Remove separators from the MAC address
-    mac_address = mac_address.replace(":", "").replace("-", "").replace(".", "")
-    if len(mac_address) != 12:
-        raise ValueError("Invalid MAC address format")
+    return _build_magic_packet(_mac_to_bytes(mac_address))
+
+def _build_magic_packet(mac_bytes):
+    """
+    Builds the Magic Packet from the 6 bytes of a MAC address: 6 bytes 0xff followed by 16 repetitions of the MAC address.
+    """
+    return b'\xff' * 6 + mac_bytes * 16
+
+class PacketCache:
+    """
+    Bounded LRU cache of ready-to-send Magic Packets.
+    
+    The packets are keyed by the canonical 48-bit MAC address, so different spellings of the same
+    MAC address (e.g. "FC-3F-DB-0B-5C-BB" and "fc:3f:db:0b:5c:bb") share one entry. The spellings seen so far
+    are mapped to their canonical MAC address, so a hit for a known spelling skips parsing. Thread-safe.
+    
+    :param maxsize: The maximum number of cached packets, 0 disables caching (default: 4096).
+    """
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._packets = OrderedDict()
+        # Spelling of the MAC address -> canonical key in _packets, cleared when it outgrows maxsize
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def get(self, mac_address):
+        """
+        Returns the Magic Packet for the MAC address, building and caching it on a miss.
+        
+        :param mac_address: The MAC address of the target device.
+        :return: The Magic Packet as a byte object.
+        :raises MacAddressError: A ValueError for MAC addresses in an unsupported format.
+        """
+        try:
+            key = self._keys.get(mac_address)
+        except TypeError:  # Unhashable, rejected by the parser below
+            key = None
+        if key is not None:
+            with self._lock:
+                magic_packet = self._packets.get(key)
+                if magic_packet is not None:
+                    self._packets.move_to_end(key)
+                    self.hits += 1
+                    return magic_packet
+        mac_bytes = _mac_to_bytes(mac_address)
+        key = int.from_bytes(mac_bytes, "big")
+        with self._lock:
+            magic_packet = self._packets.get(key)
+            if magic_packet is not None:
+                self._packets.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+                magic_packet = _build_magic_packet(mac_bytes)
+            if self.maxsize > 0:
+                self._packets[key] = magic_packet
+                while len(self._packets) > self.maxsize:
+                    self._packets.popitem(last=False)
+                if len(self._keys) >= self.maxsize:
+                    self._keys.clear()
+                self._keys[mac_address] = key
+        return magic_packet
+
+    def resize(self, maxsize):
+        """
+        Changes the maximum number of cached packets, evicting the least recently used ones if needed.
+        """
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._packets) > max(maxsize, 0):
+                self._packets.popitem(last=False)
+            if len(self._keys) > max(maxsize, 0):
+                self._keys.clear()
+
+    def invalidate(self, mac_address=None):
+        """
+        Removes the packet of one MAC address from the cache, or all packets if no MAC address is given.
+        """
+        with self._lock:
+            if mac_address is None:
+                self._packets.clear()
+                self._keys.clear()
+            else:
+                self._packets.pop(int.from_bytes(_mac_to_bytes(mac_address), "big"), None)
+
+    def stats(self):
+        """
+        Returns the cache statistics as a dict with hits, misses, size and maxsize.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._packets), "maxsize": self.maxsize}
+
+# Cache used by send_magic_packet and wake_up
+packet_cache = PacketCache()
+
+class MagicPacketBuffer:
+    """
+    Wake-on-LAN Magic Packets for many MAC addresses in one preallocated bytearray.
     
-    # Create the Magic Packet
-    mac_bytes = bytes.fromhex(mac_address)
-    magic_packet = b'\xff' * 6 + mac_bytes * 16
-    return magic_packet
+    Instead of building every packet on its own, each byte column of the packets is filled
+    for all packets at once with an extended slice assignment. Indexing or iterating hands out
+    zero-copy memoryview slices of 102 bytes, one per MAC address.
+    
+    :param joined_mac_bytes: The 6 byte MAC addresses concatenated into one bytes object.
+    """
+    def __init__(self, joined_mac_bytes):
+        if len(joined_mac_bytes) % 6:
+            raise ValueError("Invalid MAC address format")
+        count = len(joined_mac_bytes) // 6
+        self.buffer = bytearray(MAGIC_PACKET_SIZE * count)
+        header_column = b'\xff' * count
+        for offset in range(6):
+            self.buffer[offset::MAGIC_PACKET_SIZE] = header_column
+        for offset in range(6):
+            mac_column = joined_mac_bytes[offset::6]  # Byte number offset of every MAC address
+            for repetition in range(16):
+                self.buffer[6 + repetition * 6 + offset::MAGIC_PACKET_SIZE] = mac_column
+        self._view = memoryview(self.buffer)
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("Magic Packet index out of range")
+        start = index * MAGIC_PACKET_SIZE
+        return self._view[start:start + MAGIC_PACKET_SIZE]
 
-def send_magic_packet(mac_address, broadcast_ip='255.255.255.255', port=9, interface_ip=None):
+    def __iter__(self):
+        view = self._view
+        for start in range(0, len(self.buffer), MAGIC_PACKET_SIZE):
+            yield view[start:start + MAGIC_PACKET_SIZE]
+
+def create_magic_packets(mac_addresses):
+    """
+    Creates Wake-on-LAN Magic Packets for many MAC addresses in one contiguous buffer.
+    
+    :param mac_addresses: An iterable of MAC addresses.
+    :return: A MagicPacketBuffer with the packets in input order.
+    :raises ValueError: If one of the MAC addresses is invalid.
+    """
+    return MagicPacketBuffer(b''.join([_mac_to_bytes(mac_address) for mac_address in mac_addresses]))
+
+# Supported transports: UDP datagrams to a broadcast IP, or raw Ethernet frames (Linux only)
+TRANSPORTS = ("udp", "raw")
+
+def _open_raw_sender(interface_name):
+    """
+    Opens a RawEthernetSender. The module is imported on first use because it is Linux only.
+    """
+    if not interface_name:
+        raise ValueError("The raw transport needs an interface name")
+    from raw_transport import RawEthernetSender
+    return RawEthernetSender(interface_name)
+
+def _check_transport(transport):
+    if transport not in TRANSPORTS:
+        raise ValueError(f"Unknown transport {transport!r}, expected one of {', '.join(TRANSPORTS)}")
+
+def send_magic_packet(mac_address, broadcast_ip='255.255.255.255', port=9, interface_ip=None, pool=None,
+                      transport="udp", interface_name=None):
     """
     Sends a Wake-on-LAN Magic Packet to the specified MAC address.
     
@@ -26,15 +199,316 @@ def send_magic_packet(mac_address, broadcast_ip='255.255.255.255', port=9, inter
     :param broadcast_ip: The broadcast IP address (default: 255.255.255.255).
     :param port: The target port (default: 9).
     :param interface_ip: The IP address of the network interface (optional).
+    :param pool: A SocketPool to send through instead of opening a new socket (optional).
+    :param transport: "udp" (default) or "raw" to send an Ethernet frame with EtherType 0x0842 (Linux only).
+    :param interface_name: The name of the network interface for the raw transport, e.g. "eth0".
     """
-    magic_packet = create_magic_packet(mac_address)
-    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+    if not metrics.sinks:
+        _send_magic_packet(mac_address, broadcast_ip, port, interface_ip, pool, transport, interface_name)
+        return
+    interface = interface_name if transport == "raw" else interface_ip
+    start_time = time.time()
+    start = time.perf_counter()
+    error = None
+    try:
+        _send_magic_packet(mac_address, broadcast_ip, port, interface_ip, pool, transport, interface_name)
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        metrics.record_send(interface, 0 if error else 1, 1 if error else 0, seconds)
+        metrics.record_span("send_magic_packet", start_time, seconds, mac_address=mac_address, interface=interface,
+                            broadcast_ip=broadcast_ip, port=port, transport=transport, error=error)
+
+def _send_magic_packet(mac_address, broadcast_ip, port, interface_ip, pool, transport, interface_name):
+    _check_transport(transport)
+    magic_packet = packet_cache.get(mac_address)
+    if transport == "raw":
+        with _open_raw_sender(interface_name) as sender:
+            sender.send(magic_packet)
+        return
+    if pool is not None:
+        pool.sendto(magic_packet, (broadcast_ip, port), interface_ip)
+        return
+    with open_broadcast_socket(interface_ip) as sock:
+        sock.sendto(magic_packet, (broadcast_ip, port))
+
+def open_broadcast_socket(interface_ip=None):
+    """
+    Opens a UDP socket that is allowed to send broadcasts.
+    
+    :param interface_ip: The IP address of the network interface to bind to (optional).
+    :return: The socket. The caller is responsible for closing it.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
         sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
         if interface_ip:
             sock.bind((interface_ip, 0))  # Bind to the specific interface
-        sock.sendto(magic_packet, (broadcast_ip, port))
+    except OSError:
+        sock.close()
+        raise
+    return sock
 
-def wake_up(mac_address, broadcast_ip='255.255.255.255', port=9, interface_ip=None):
+class _PooledSocket:
+    """
+    The socket of one interface in a SocketPool, None while closed. The lock serializes the sends through it.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.socket = None
+        self.last_used = 0.0
+
+class SocketPool:
+    """
+    Keeps one open broadcast socket per interface IP for repeated sends.
+    
+    A socket that fails to send is closed and rebuilt. Sockets that were not used for idle_timeout
+    seconds are closed by close_idle(), which long-running users call periodically (sendto also calls
+    it at most once per idle_timeout). Thread-safe: every interface has its own lock, so sends through
+    different interfaces run in parallel. Can be used as a context manager, otherwise call close() when done.
+    
+    :param idle_timeout: Seconds after which an unused socket is closed (default: 60).
+    """
+    def __init__(self, idle_timeout=60):
+        self.idle_timeout = idle_timeout
+        self._entries = {}  # interface_ip -> _PooledSocket, kept when its socket is closed
+        self._lock = threading.Lock()  # Guards _entries only
+        self._last_idle_check = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _entry(self, interface_ip):
+        entry = self._entries.get(interface_ip)
+        if entry is None:
+            with self._lock:
+                entry = self._entries.setdefault(interface_ip, _PooledSocket())
+        return entry
+
+    def _all_entries(self):
+        with self._lock:
+            return list(self._entries.values())
+
+    def sendto(self, data, address, interface_ip=None):
+        """
+        Sends data to address through the socket of the interface, opening it if needed.
+        
+        :param data: The bytes to send.
+        :param address: The (broadcast_ip, port) tuple to send to.
+        :param interface_ip: The IP address of the network interface (optional).
+        """
+        if time.monotonic() - self._last_idle_check > self.idle_timeout:
+            self.close_idle()
+        entry = self._entry(interface_ip)
+        with entry.lock:
+            for attempt in range(2):
+                if entry.socket is None:
+                    entry.socket = open_broadcast_socket(interface_ip)
+                try:
+                    entry.socket.sendto(data, address)
+                    entry.last_used = time.monotonic()
+                    return
+                except OSError:
+                    # Drop the broken socket, retry once with a new one
+                    entry.socket.close()
+                    entry.socket = None
+                    if attempt:
+                        raise
+
+    def close_idle(self):
+        """
+        Closes all sockets that were not used for idle_timeout seconds. Sockets busy sending are skipped.
+        """
+        now = self._last_idle_check = time.monotonic()
+        for entry in self._all_entries():
+            if not entry.lock.acquire(blocking=False):
+                continue
+            try:
+                if entry.socket is not None and now - entry.last_used > self.idle_timeout:
+                    entry.socket.close()
+                    entry.socket = None
+            finally:
+                entry.lock.release()
+
+    def close(self):
+        """
+        Closes all sockets.
+        """
+        for entry in self._all_entries():
+            with entry.lock:
+                if entry.socket is not None:
+                    entry.socket.close()
+                    entry.socket = None
+
+def _normalize_target(target, broadcast_ip, port, interface_ip):
+    """
+    Turns a batch item into a (mac_address, broadcast_ip, port, interface_ip) tuple.
+    
+    A batch item is either a MAC address string or a tuple whose first element is the
+    MAC address, optionally followed by broadcast IP, port and interface IP. Missing or
+    None values fall back to the given defaults.
+    """
+    if isinstance(target, str):
+        return target, broadcast_ip, port, interface_ip
+    target = tuple(target) + (None,) * (4 - len(target))
+    mac_address, target_broadcast_ip, target_port, target_interface_ip = target[:4]
+    return (
+        mac_address,
+        target_broadcast_ip or broadcast_ip,
+        target_port or port,
+        target_interface_ip or interface_ip,
+    )
+
+def send_magic_packets(mac_addresses, broadcast_ip='255.255.255.255', port=9, interface_ip=None,
+                       transport="udp", interface_name=None, pool=None):
+    """
+    Sends Wake-on-LAN Magic Packets to many MAC addresses.
+    
+    Instead of opening a socket for every packet, the targets are grouped by
+    (interface_ip, broadcast_ip, port) and one socket per group is used for all of its packets,
+    or the socket of the interface in pool. With the raw transport all packets go through one raw socket on interface_name.
+    Duplicate targets (the same canonical MAC address, broadcast IP, port and interface) are
+    sent once and get the result of the first one.
+    
+    :param mac_addresses: An iterable of MAC addresses, or of tuples
+        (mac_address, broadcast_ip, port, interface_ip) to override the defaults per target.
+    :param broadcast_ip: The default broadcast IP address (default: 255.255.255.255).
+    :param port: The default target port (default: 9).
+    :param interface_ip: The default IP address of the network interface (optional).
+    :param transport: "udp" (default) or "raw" to send Ethernet frames with EtherType 0x0842 (Linux only).
+    :param interface_name: The name of the network interface for the raw transport, e.g. "eth0".
+    :param pool: A SocketPool to send through instead of opening new sockets (optional, UDP only).
+    :return: A list of (mac_address, error) tuples in input order. error is None on success,
+        otherwise the exception that occurred for this MAC address.
+    """
+    _check_transport(transport)
+    targets = [_normalize_target(target, broadcast_ip, port, interface_ip) for target in mac_addresses]
+    results = [None] * len(targets)
+    instrumented = bool(metrics.sinks)
+    if instrumented:
+        metrics.record_batch(len(targets))
+        start_time = time.time()
+        start = time.perf_counter()
+
+    # Parse all MAC addresses first, the packets of the valid ones are built in one buffer
+    valid_indices = []
+    mac_bytes_list = []
+    first_indices = {}  # (MAC bytes, broadcast_ip, port, interface_ip) -> index of the first target
+    duplicates = []  # (index, index of the first target)
+    for index, target in enumerate(targets):
+        try:
+            mac_bytes = _mac_to_bytes(target[0])
+        except ValueError as e:
+            results[index] = (target[0], e)
+            continue
+        first_index = first_indices.setdefault((mac_bytes, *target[1:]), index)
+        if first_index != index:
+            duplicates.append((index, first_index))
+            continue
+        mac_bytes_list.append(mac_bytes)
+        valid_indices.append(index)
+    packets = MagicPacketBuffer(b''.join(mac_bytes_list))
+    packet_numbers = {index: number for number, index in enumerate(valid_indices)}
+
+    if transport == "raw":
+        _send_raw_batch(targets, valid_indices, packets, results, interface_name)
+        _copy_duplicate_results(targets, duplicates, results)
+        if instrumented:
+            _record_batch(start_time, start, results, interface_name, transport)
+        return results
+
+    # Group the targets so that every (interface_ip, broadcast_ip, port) combination gets one socket
+    groups = {}
+    for index in valid_indices:
+        mac_address, target_broadcast_ip, target_port, target_interface_ip = targets[index]
+        key = (target_interface_ip, target_broadcast_ip, target_port)
+        groups.setdefault(key, []).append(index)
+
+    for (group_interface_ip, group_broadcast_ip, group_port), indices in groups.items():
+        group_start = time.perf_counter() if instrumented else None
+        address = (group_broadcast_ip, group_port)
+        if pool is not None:
+            sock = None
+            send = lambda packet: pool.sendto(packet, address, group_interface_ip)
+        else:
+            try:
+                sock = open_broadcast_socket(group_interface_ip)
+            except OSError as e:
+                for index in indices:
+                    results[index] = (targets[index][0], e)
+                if instrumented:
+                    metrics.record_send(group_interface_ip, 0, len(indices), time.perf_counter() - group_start)
+                continue
+            send = lambda packet: sock.sendto(packet, address)
+        failed = 0
+        try:
+            for index in indices:
+                mac_address = targets[index][0]
+                try:
+                    send(packets[packet_numbers[index]])
+                    results[index] = (mac_address, None)
+                except OSError as e:
+                    results[index] = (mac_address, e)
+                    failed += 1
+        finally:
+            if sock is not None:
+                sock.close()
+        if instrumented:
+            metrics.record_send(group_interface_ip, len(indices) - failed, failed, time.perf_counter() - group_start)
+    _copy_duplicate_results(targets, duplicates, results)
+    if instrumented:
+        # Invalid MAC addresses were never sent, count them as failed on the default interface
+        invalid = len(targets) - len(valid_indices) - len(duplicates)
+        if invalid:
+            metrics.record_send(interface_ip, 0, invalid, 0.0)
+        _record_batch(start_time, start, results, interface_ip, transport)
+    return results
+
+def _copy_duplicate_results(targets, duplicates, results):
+    for index, first_index in duplicates:
+        results[index] = (targets[index][0], results[first_index][1])
+
+def _record_batch(start_time, start, results, interface, transport):
+    """
+    Records the trace span of a send_magic_packets call.
+    """
+    failed = sum(1 for _, error in results if error is not None)
+    metrics.record_span("send_magic_packets", start_time, time.perf_counter() - start, size=len(results),
+                        failed=failed, interface=interface, transport=transport)
+
+def _send_raw_batch(targets, valid_indices, packets, results, interface_name):
+    """
+    Sends the packets of a batch through one raw Ethernet socket and stores the results.
+    """
+    if not valid_indices:
+        return
+    try:
+        sender = _open_raw_sender(interface_name)
+    except (ValueError, OSError) as e:
+        for index in valid_indices:
+            results[index] = (targets[index][0], e)
+        return
+    start = time.perf_counter()
+    failed = 0
+    with sender:
+        for number, index in enumerate(valid_indices):
+            mac_address = targets[index][0]
+            try:
+                sender.send(packets[number])
+                results[index] = (mac_address, None)
+            except OSError as e:
+                results[index] = (mac_address, e)
+                failed += 1
+    if metrics.sinks:
+        metrics.record_send(interface_name, len(valid_indices) - failed, failed, time.perf_counter() - start)
+
+def wake_up(mac_address, broadcast_ip='255.255.255.255', port=9, interface_ip=None, pool=None,
+            transport="udp", interface_name=None):
     """
     Sends a Wake-on-LAN Magic Packet and prints a success message.
     
@@ -42,27 +516,217 @@ def wake_up(mac_address, broadcast_ip='255.255.255.255', port=9, interface_ip=No
     :param broadcast_ip: The broadcast IP address (default: 255.255.255.255).
     :param port: The target port (default: 9).
     :param interface_ip: The IP address of the network interface (optional).
+    :param pool: A SocketPool to send through instead of opening a new socket (optional).
+    :param transport: "udp" (default) or "raw" (see send_magic_packet).
+    :param interface_name: The name of the network interface for the raw transport.
+    :return: True if the packet was sent, False if an error occurred.
     """
     try:
-        send_magic_packet(mac_address, broadcast_ip, port, interface_ip)
-        print(f"Wake-on-LAN packet sent to: {mac_address} via {broadcast_ip}:{port} (Interface: {interface_ip})")
+        send_magic_packet(mac_address, broadcast_ip, port, interface_ip, pool, transport, interface_name)
+        if transport == "raw":
+            print(f"Wake-on-LAN frame sent to: {mac_address} (Interface: {interface_name})")
+        else:
+            print(f"Wake-on-LAN packet sent to: {mac_address} via {broadcast_ip}:{port} (Interface: {interface_ip})")
+        return True
     except Exception as e:
         print(f"An error occurred: {e}")
+        return False
+
+def wake_up_many(mac_addresses, broadcast_ip='255.255.255.255', port=9, interface_ip=None):
+    """
+    Sends Wake-on-LAN Magic Packets to many MAC addresses and prints a message for each of them.
+    
+    :param mac_addresses: An iterable of MAC addresses or target tuples (see send_magic_packets).
+    :param broadcast_ip: The default broadcast IP address (default: 255.255.255.255).
+    :param port: The default target port (default: 9).
+    :param interface_ip: The default IP address of the network interface (optional).
+    :return: A list of (mac_address, error) tuples in input order (see send_magic_packets).
+    """
+    results = send_magic_packets(mac_addresses, broadcast_ip, port, interface_ip)
+    for mac_address, error in results:
+        if error is None:
+            print(f"Wake-on-LAN packet sent to: {mac_address}")
+        else:
+            print(f"An error occurred for {mac_address}: {error}")
+    return results
+
+def read_mac_addresses(sources, stdin=None):
+    """
+    Yields the MAC addresses of the command line arguments one at a time, files are read line by line.
+    
+    :param sources: MAC addresses, "-" for one MAC address per line on stdin, or paths of files with one MAC address
+        per line. Empty lines and lines starting with # are skipped.
+    :param stdin: The file to read "-" from (default: sys.stdin).
+    """
+    for source in sources:
+        if source == "-":
+            yield from _read_lines(stdin or sys.stdin)
+        elif os.path.isfile(source):
+            with open(source, "r") as file:
+                yield from _read_lines(file)
+        else:
+            yield source
+
+def _read_lines(file):
+    for line in file:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield line
+
+def wake_up_stream(mac_addresses, broadcast_ip='255.255.255.255', port=9, interface_ip=None,
+                   transport="udp", interface_name=None):
+    """
+    Sends Wake-on-LAN Magic Packets to a stream of MAC addresses through one socket and prints a message for each.
+    
+    The MAC addresses are consumed one at a time, so memory use does not grow with the length of the input.
+    
+    :param mac_addresses: An iterable of MAC addresses, e.g. the generator of read_mac_addresses.
+    :param broadcast_ip: The broadcast IP address (default: 255.255.255.255).
+    :param port: The target port (default: 9).
+    :param interface_ip: The IP address of the network interface (optional).
+    :param transport: "udp" (default) or "raw" (see send_magic_packet).
+    :param interface_name: The name of the network interface for the raw transport.
+    :return: A (sent, failed) tuple with the number of MAC addresses.
+    """
+    _check_transport(transport)
+    if transport == "raw":
+        sender = _open_raw_sender(interface_name)
+        send = sender.send
+    else:
+        sender = open_broadcast_socket(interface_ip)
+        address = (broadcast_ip, port)
+        send = lambda magic_packet: sender.sendto(magic_packet, address)
+    sent = failed = 0
+    start = time.perf_counter()
+    with sender:
+        for mac_address in mac_addresses:
+            try:
+                send(create_magic_packet(mac_address))
+                sent += 1
+                print(f"Wake-on-LAN packet sent to: {mac_address}")
+            except (ValueError, OSError) as e:
+                failed += 1
+                print(f"An error occurred for {mac_address}: {e}")
+    if metrics.sinks:
+        metrics.record_send(interface_name if transport == "raw" else interface_ip, sent, failed,
+                            time.perf_counter() - start)
+    return sent, failed
+
+def _resolve_devices(store, patterns, groups):
+    """
+    Returns the MAC addresses of the devices of the device store matching the name patterns or in the groups,
+    or None after printing the patterns and groups without a device.
+    """
+    mac_addresses = []
+    missing = []
+    for pattern in patterns:
+        devices = store.find_by_name_pattern(pattern)
+        mac_addresses.extend(device["mac"] for device in devices)
+        if not devices:
+            missing.append(f"name {pattern!r}")
+    for group in groups:
+        devices = store.members(group)
+        mac_addresses.extend(device["mac"] for device in devices)
+        if not devices:
+            missing.append(f"group {group!r}")
+    for description in missing:
+        print(f"No device found for {description}")
+    return None if missing else mac_addresses
+
+def default_broadcast_ip(interface_ip=None):
+    """
+    Returns the broadcast IP address to use for an interface.
+    
+    With an interface IP the directed broadcast address of its subnet is used (needs psutil),
+    otherwise or if it cannot be determined 255.255.255.255.
+    
+    :param interface_ip: The IP address of the network interface (optional).
+    """
+    if not interface_ip:
+        return '255.255.255.255'
+    from interfaces import inventory
+    try:
+        return inventory.broadcast_for(interface_ip)
+    except ImportError:  # psutil is not installed
+        return '255.255.255.255'
 
 def main():
     """
     Main function for using the script via the console.
     """
-    parser = argparse.ArgumentParser(description="Sends a Wake-on-LAN Magic Packet.")
-    parser.add_argument("mac_address", help="The MAC address of the target device (e.g., 00:11:22:33:44:55).")
-    parser.add_argument("--broadcast_ip", default="255.255.255.255", help="The broadcast IP address (default: 255.255.255.255).")
-    parser.add_argument("--port", type=int, default=9, help="The target port (default: 9).")
-    parser.add_argument("--interface_ip", help="The IP address of the network interface (optional).")
+    if sys.argv[1:2] == ["status"]:
+        from status import status_main
+        status_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["verify"]:
+        from verify import verify_main
+        verify_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["daemon"]:
+        from daemon import daemon_main
+        daemon_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["relay"]:
+        from relay import relay_main
+        relay_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["schedule"]:
+        from scheduler import schedule_main
+        schedule_main(sys.argv[2:])
+        return
+    import argparse  # Imported here so that importing wol as a module stays fast
+    parser = argparse.ArgumentParser(description="Sends Wake-on-LAN Magic Packets. Use \"wol.py status\" to show the power state of devices, \"wol.py verify\" to wake devices and wait until they are up, \"wol.py daemon\" to serve wake requests, \"wol.py relay\" to relay Magic Packets into other subnets and \"wol.py schedule\" to wake all devices of the device store in paced waves.")
+    parser.add_argument("mac_addresses", nargs="*", metavar="mac_address", help="The MAC addresses of the target devices (e.g., 00:11:22:33:44:55), \"-\" to read one MAC address per line from stdin, or files with one MAC address per line.")
+    parser.add_argument("--broadcast_ip", help="The broadcast IP address (default: the broadcast address of the interface, otherwise 255.255.255.255).")
+    parser.add_argument("--port", type=int, help="The target port (default: the port of the group, otherwise 9).")
+    parser.add_argument("--interface_ip", help="The IP address of the network interface (optional, groups use their preferred interface).")
+    parser.add_argument("--name", action="append", default=[], metavar="PATTERN", help="Wake the devices of the device store with this name, name prefix or glob pattern (e.g., \"office-*\"). Can be repeated.")
+    parser.add_argument("--group", action="append", default=[], metavar="TAG", help="Wake the devices of this group or tag of the device store with the send options of the group. Can be repeated.")
+    parser.add_argument("--db", help="The device store database file (default: config/devices.db).")
+    parser.add_argument("--transport", choices=TRANSPORTS, default="udp", help="Send UDP datagrams (default) or raw Ethernet frames (Linux only, needs root).")
+    parser.add_argument("--interface", help="The name of the network interface for the raw transport (e.g., eth0).")
     
     args = parser.parse_args()
+    if not (args.mac_addresses or args.name or args.group):
+        parser.error("Give MAC addresses, --name or --group")
+    broadcast_ip = args.broadcast_ip or default_broadcast_ip(args.interface_ip)
+    
+    port = args.port or 9
+    sources = args.mac_addresses
+    failed = 0
+    if args.name or args.group:
+        from device_store import DB_FILE, open_store
+        with open_store(args.db or DB_FILE) as store:
+            if args.group and args.transport == "udp":
+                # Groups are sent in one batch with their preferred send options, the results are shown per group
+                if _resolve_devices(store, [], args.group) is None:
+                    sys.exit(1)
+                from groups import wake_groups
+                for result in wake_groups(store, args.group, args.broadcast_ip, args.port, args.interface_ip):
+                    print(f"Group {result.name}: {result.sent}/{result.total} sent, {result.failed} failed")
+                    for mac_address, error in result.errors:
+                        print(f"  {mac_address}: {error}")
+                    failed += result.failed
+                device_macs = _resolve_devices(store, args.name, [])
+            else:
+                device_macs = _resolve_devices(store, args.name, args.group)
+        if device_macs is None:
+            sys.exit(1)
+        sources = sources + list(dict.fromkeys(device_macs))  # A device matching several names is sent once
+        if not sources:
+            sys.exit(1 if failed else 0)
+    if len(sources) == 1 and sources[0] != "-" and not os.path.isfile(sources[0]):
+        # Send the Magic Packet
+        if not wake_up(sources[0], broadcast_ip, port, args.interface_ip,
+                       transport=args.transport, interface_name=args.interface):
+            failed += 1
+        sys.exit(1 if failed else 0)
     
-    # Send the Magic Packet
-    wake_up(args.mac_address, args.broadcast_ip, args.port, args.interface_ip)
+    # Send the Magic Packets of all MAC addresses through one socket
+    _, stream_failed = wake_up_stream(read_mac_addresses(sources), broadcast_ip, port, args.interface_ip,
+                                      args.transport, args.interface)
+    if failed or stream_failed:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,143 @@
+import asyncio
+import socket
+
+from mac_address import parse_mac
+from wol import create_magic_packet, _normalize_target
+
+class _MagicPacketProtocol(asyncio.DatagramProtocol):
+    """
+    Datagram protocol for one sending socket. Tracks the write buffer state so senders can wait for it to drain.
+    """
+    def __init__(self):
+        self.transport = None
+        self.error = None
+        self._can_write = asyncio.Event()
+        self._can_write.set()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def connection_lost(self, exc):
+        self.error = exc
+        self._can_write.set()  # Wake up waiting senders, they will see the closed transport
+
+    def error_received(self, exc):
+        self.error = exc
+
+    def pause_writing(self):
+        self._can_write.clear()
+
+    def resume_writing(self):
+        self._can_write.set()
+
+    async def drain(self):
+        await self._can_write.wait()
+
+class AsyncWakeOnLan:
+    """
+    Sends Wake-on-LAN Magic Packets with asyncio.
+    
+    One datagram transport is opened per interface IP and shared by all sends through that interface.
+    The number of sends in flight is limited by concurrency, every single send is limited by timeout.
+    Can be used as an async context manager, otherwise call close() when done.
+    
+    :param concurrency: The maximum number of sends in flight (default: 256).
+    :param timeout: The timeout in seconds for each single send (default: 1.0).
+    """
+    def __init__(self, concurrency=256, timeout=1.0):
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._endpoints = {}
+        self._endpoint_lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+    async def _get_protocol(self, interface_ip):
+        protocol = self._endpoints.get(interface_ip)
+        if protocol is not None and not protocol.transport.is_closing():
+            return protocol
+        async with self._endpoint_lock:
+            protocol = self._endpoints.get(interface_ip)
+            if protocol is None or protocol.transport.is_closing():
+                loop = asyncio.get_running_loop()
+                _, protocol = await loop.create_datagram_endpoint(
+                    _MagicPacketProtocol,
+                    local_addr=(interface_ip, 0) if interface_ip else None,
+                    family=socket.AF_INET,
+                    allow_broadcast=True,
+                )
+                self._endpoints[interface_ip] = protocol
+            return protocol
+
+    async def _send(self, magic_packet, broadcast_ip, port, interface_ip):
+        protocol = await self._get_protocol(interface_ip)
+        await protocol.drain()
+        if protocol.transport.is_closing():
+            raise ConnectionError(f"Socket for interface {interface_ip} was closed: {protocol.error}")
+        protocol.transport.sendto(magic_packet, (broadcast_ip, port))
+
+    async def wake(self, mac_address, broadcast_ip='255.255.255.255', port=9, interface_ip=None):
+        """
+        Sends a Wake-on-LAN Magic Packet to the specified MAC address.
+        
+        :param mac_address: The MAC address of the target device.
+        :param broadcast_ip: The broadcast IP address (default: 255.255.255.255).
+        :param port: The target port (default: 9).
+        :param interface_ip: The IP address of the network interface (optional).
+        :raises ValueError: If the MAC address is invalid.
+        :raises asyncio.TimeoutError: If the send did not finish within the timeout.
+        """
+        magic_packet = create_magic_packet(mac_address)
+        async with self._semaphore:
+            await asyncio.wait_for(self._send(magic_packet, broadcast_ip, port, interface_ip), self.timeout)
+
+    def close(self):
+        """
+        Closes all open transports.
+        """
+        for protocol in self._endpoints.values():
+            protocol.transport.close()
+        self._endpoints.clear()
+
+async def _wake_target(engine, target):
+    mac_address, broadcast_ip, port, interface_ip = target
+    try:
+        await engine.wake(mac_address, broadcast_ip, port, interface_ip)
+        return mac_address, None
+    except (ValueError, OSError, asyncio.TimeoutError) as e:
+        return mac_address, e
+
+async def async_wake_many(mac_addresses, broadcast_ip='255.255.255.255', port=9, interface_ip=None,
+                          concurrency=256, timeout=1.0):
+    """
+    Sends Wake-on-LAN Magic Packets to many MAC addresses with asyncio.
+    
+    :param mac_addresses: An iterable of MAC addresses, or of tuples
+        (mac_address, broadcast_ip, port, interface_ip) to override the defaults per target.
+    :param broadcast_ip: The default broadcast IP address (default: 255.255.255.255).
+    :param port: The default target port (default: 9).
+    :param interface_ip: The default IP address of the network interface (optional).
+    :param concurrency: The maximum number of sends in flight (default: 256).
+    :param timeout: The timeout in seconds for each single send (default: 1.0).
+    :return: A list of (mac_address, error) tuples in input order. error is None on success,
+        otherwise the exception that occurred for this MAC address. Duplicate targets (the same
+        canonical MAC address, broadcast IP, port and interface) are sent once and share the result.
+    """
+    targets = [_normalize_target(target, broadcast_ip, port, interface_ip) for target in mac_addresses]
+    keys = []
+    unique = {}
+    for target in targets:
+        try:
+            key = (parse_mac(target[0]), *target[1:])
+        except ValueError:
+            key = target  # Fails in wake() with the parse error
+        keys.append(key)
+        unique.setdefault(key, target)
+    async with AsyncWakeOnLan(concurrency, timeout) as engine:
+        errors = dict(zip(unique, [error for _, error in await asyncio.gather(
+            *(_wake_target(engine, target) for target in unique.values()))]))
+    return [(target[0], errors[key]) for target, key in zip(targets, keys)]